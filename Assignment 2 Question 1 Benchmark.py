@@ -0,0 +1,417 @@
+import argparse  # Used for the command line
+import importlib.util  # Used to load the cipher script, whose file name is not a valid module name
+import json  # Used for machine-readable results
+import os  # Used for paths
+import platform  # Used to record the machine in saved results
+import random  # Used to generate synthetic text
+import shutil  # Used for the raw copy baseline
+import sys  # Used to register the loaded module
+import tempfile  # Used for scratch files
+import time  # Used for timings
+import tracemalloc  # Used to measure allocations and peak Python memory
+try:
+    import resource  # Used for peak RSS (not available on Windows)
+except ImportError:
+    resource = None
+
+"""Benchmarks for 'Assingnment 2 Question 1.py' (the cipher).
+Run directly: python "Assignment 2 Question 1 Benchmark.py" [suite] [options]; see --help.
+"""
+
+
+def load_cipher():
+    # Import "Assingnment 2 Question 1.py" as a module named cipher
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Assingnment 2 Question 1.py")
+    spec = importlib.util.spec_from_file_location("cipher", path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["cipher"] = module  # Needed so worker processes can unpickle its functions
+    spec.loader.exec_module(module)
+    return module
+
+
+cipher = load_cipher()
+
+
+def generate_text(size, non_ascii_rate=0.01, seed=0):
+    # About size bytes of UTF-8 text: words of mixed-case letters, digits and punctuation, with a share of
+    # non-ASCII characters (2-4 bytes each in UTF-8). A 1 MB block is generated and repeated.
+    rng = random.Random(seed)
+    alphabet = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789.,;:!?'-"
+    extra = "éüßñøçåæœ—“”€日本語한국어😀"
+    words = []
+    for _ in range(5000):
+        word = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 10)))
+        if rng.random() < non_ascii_rate * 5:
+            word += rng.choice(extra)
+        words.append(word)
+    block = []
+    length = 0
+    while length < min(size, 1 << 20):
+        line = " ".join(rng.choice(words) for _ in range(rng.randint(5, 15))) + "\n"
+        block.append(line)
+        length += len(line.encode("utf-8"))
+    block = "".join(block)
+    return block * max(1, size // len(block.encode("utf-8")))
+
+
+def rate(size, seconds):
+    return f"{size / seconds / 1e6:8.1f} MB/s"
+
+
+def original_encrypt(text, n, m):
+    # The previous encrypt_text: build the dict table on every call, then str.translate
+    return text.translate(cipher.build_translation_table(n, m))
+
+
+def benchmark_throughput(size_mb=256, n=5, m=7):
+    # str.translate with a dict table vs the cached Cipher on text and on raw bytes
+    text = generate_text(size_mb * 1_000_000)
+    data = text.encode("utf-8")
+    size = len(data)
+    print(f"Throughput on {size / 1e6:.0f} MB of text, key ({n}, {m})")
+    key = cipher.get_cipher(n, m)
+    for label, run in (("str.translate (previous)", lambda: original_encrypt(text, n, m)),
+                       ("encrypt_text (Cipher)", lambda: cipher.encrypt_text(text, n, m)),
+                       ("Cipher.encrypt_bytes", lambda: key.encrypt_bytes(data))):
+        start = time.perf_counter()
+        run()
+        seconds = time.perf_counter() - start
+        print(f"  {label:<26} {seconds:7.3f}s {rate(size, seconds)}")
+    same = original_encrypt(text, n, m).encode("utf-8") == key.encrypt_bytes(data)
+    print(f"  identical output           : {same}")
+
+
+def generate_corpus(alphabet, length, seed=0):
+    # length characters drawn from alphabet (a 100 000 character block, repeated and cut to length)
+    rng = random.Random(seed)
+    block = "".join(rng.choice(alphabet) for _ in range(min(length, 100_000)))
+    return (block * (length // len(block) + 1))[:length]
+
+
+# Character mixes for benchmark_unicode: mostly ASCII prose, Western European text, and CJK with some Latin.
+CORPORA = {
+    "ASCII": "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789     .,;:!?'-\n",
+    "Latin-1-heavy": "abcdefghijklmnopqrstuvwxyzABCDEFéèêàâçôûüöäßñÉÀÜ     .,;«»\n",
+    "CJK-heavy": "日本語中文漢字文字列処理한국어텍스트abcdeABCDE   。、\n",
+}
+
+
+def benchmark_unicode(length=20_000_000, n=5, m=7):
+    # str.translate with a dict table vs the byte-table paths on different character mixes.
+    # Rates are per character, so the corpora compare fairly despite different UTF-8 sizes.
+    table = cipher.build_translation_table(n, m)
+    key = cipher.get_cipher(n, m)
+    print(f"Unicode throughput, {length / 1e6:.0f}M characters per corpus, key ({n}, {m})")
+    for name, alphabet in CORPORA.items():
+        text = generate_corpus(alphabet, length)
+        expected = text.translate(table)
+        print(f"  {name} ({len(text.encode('utf-8')) / len(text):.2f} UTF-8 bytes per character)")
+        for label, run in (("str.translate (dict)", lambda: text.translate(table)),
+                           ("UTF-8 bytes only", lambda: text.encode("utf-8").translate(key.encryption_bytes)
+                            .decode("utf-8")),
+                           ("encrypt_text", lambda: key.encrypt(text))):
+            start = time.perf_counter()
+            result = run()
+            seconds = time.perf_counter() - start
+            print(f"    {label:<24} {seconds:7.3f}s {len(text) / seconds / 1e6:8.1f} Mchar/s"
+                  f"{'' if result == expected else '  MISMATCH'}")
+
+
+def peak_rss():
+    # Peak resident set size of this process in bytes, or None where the resource module is unavailable
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux reports kilobytes, macOS bytes
+
+
+def write_text_file(path, size):
+    # Write about size bytes of generated text in 64 MB pieces, so the file can be larger than memory
+    piece = generate_text(min(size, 64_000_000)).encode("utf-8")
+    written = 0
+    with open(path, "wb") as f:
+        while written < size:
+            f.write(piece[:size - written])
+            written += len(piece[:size - written])
+    return written
+
+
+def raw_copy(source, target, chunk_size):
+    with open(source, "rb") as f, open(target, "wb") as out:
+        shutil.copyfileobj(f, out, chunk_size)
+
+
+def benchmark_streaming(size_mb=1024, n=5, m=7, chunk_size=None):
+    # encrypt_file against a plain chunked copy of the same file; peak RSS shows memory stays flat
+    chunk_size = chunk_size or cipher.CHUNK_SIZE
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "raw.txt")
+        target = os.path.join(directory, "out.txt")
+        size = write_text_file(source, size_mb * 1_000_000)
+        rss_before = peak_rss()
+        print(f"Streaming {size / 1e6:.0f} MB file to file, {chunk_size // 1024} KiB chunks")
+        for label, run in (("raw copy", lambda: raw_copy(source, target, chunk_size)),
+                           ("encrypt_file", lambda: cipher.encrypt_file(source, target, n, m, chunk_size)),
+                           ("encrypt_file, no UTF-8 check",
+                            lambda: cipher.encrypt_file(source, target, n, m, chunk_size, validate=False))):
+            start = time.perf_counter()
+            run()
+            seconds = time.perf_counter() - start
+            print(f"  {label:<30} {seconds:7.3f}s {rate(size, seconds)}")
+        if rss_before is not None:
+            print(f"  peak RSS growth while streaming: {(peak_rss() - rss_before) / 1e6:.1f} MB")
+
+
+def benchmark_bulk(size_mb=1024, n=5, m=7, process_counts=(1, 2, 4, 8)):
+    # Memory-mapped multi-process mode against the streaming path. Speed-up is bounded by
+    # os.cpu_count() and by disk bandwidth once the file no longer sits in the page cache.
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "raw.txt")
+        expected = os.path.join(directory, "expected.txt")
+        target = os.path.join(directory, "out.txt")
+        size = write_text_file(source, size_mb * 1_000_000)
+        print(f"Bulk mode on a {size / 1e6:.0f} MB file ({os.cpu_count()} CPUs)")
+        start = time.perf_counter()
+        cipher.encrypt_file(source, expected, n, m)
+        baseline = time.perf_counter() - start
+        print(f"  {'encrypt_file (streaming)':<30} {baseline:7.3f}s {rate(size, baseline)}")
+        for processes in process_counts:
+            start = time.perf_counter()
+            cipher.encrypt_file_bulk(source, target, n, m, processes)
+            seconds = time.perf_counter() - start
+            same = "identical" if cipher.files_equal(expected, target) else "MISMATCH"
+            print(f"  {f'encrypt_file_bulk, {processes} proc':<30} {seconds:7.3f}s {rate(size, seconds)} "
+                  f"x{baseline / seconds:.2f} {same}")
+
+
+# Input sizes for benchmark_matrix, 1 KB to 1 GB; --max-mb decides how far up a run goes.
+SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000, 1_000_000_000]
+
+# Key sets for benchmark_matrix: one typical key, and keys spread over the key space including
+# negative and very large values (which must cost the same once reduced mod 13).
+KEY_SETS = {
+    "single": [(5, 7)],
+    "spread": [(1, 1), (3, 12), (-7, 4), (12, 12), (10 ** 9 + 7, -10 ** 6)],
+}
+
+
+def table_engine(n, m):
+    # The cipher as shipped: cached 256-byte tables through encrypt_text/decrypt_text
+    return {"build": lambda: cipher.Cipher(n, m),
+            "encrypt": lambda text: cipher.encrypt_text(text, n, m),
+            "decrypt": lambda text: cipher.decrypt_text(text, n, m)}
+
+
+def dict_engine(n, m):
+    # The original approach: dict tables and str.translate (tables built once, outside the timing)
+    encryption_table = cipher.build_translation_table(n, m)
+    decryption_table = cipher.build_decryption_table(n, m)
+    return {"build": lambda: (cipher.build_translation_table(n, m), cipher.build_decryption_table(n, m)),
+            "encrypt": lambda text: text.translate(encryption_table),
+            "decrypt": lambda text: text.translate(decryption_table)}
+
+
+# Engine variants benchmark_matrix can compare; each maps a key to build/encrypt/decrypt callables.
+ENGINES = {"table": table_engine, "dict": dict_engine}
+
+
+def measure(run, repeats=3, min_seconds=0.05):
+    # Best time per call over repeats rounds (each looped until it takes min_seconds), then one traced
+    # call for memory: peak_bytes is the peak of Python allocations during the call and blocks the number
+    # of memory blocks it left allocated (its result). Freed temporaries are not counted in blocks.
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        seconds = time.perf_counter() - start
+        if seconds >= min_seconds or number >= 1_000_000:
+            break
+        number *= 10
+    best = seconds / number
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        best = min(best, (time.perf_counter() - start) / number)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    result = run()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]  # The snapshots' own bookkeeping
+    changes = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "filename")
+    blocks = sum(stat.count_diff for stat in changes if stat.count_diff > 0)
+    del result
+    return {"seconds": best, "peak_bytes": peak, "blocks": blocks}
+
+
+def benchmark_matrix(max_mb=100, mixes=None, key_sets=None, engines=("table",)):
+    # Table build, encrypt and decrypt for every engine, character mix, key set and size up to max_mb.
+    # Returns one result dict per combination (times are averaged over the keys in the set).
+    rows = []
+    sizes = [size for size in SIZES if size <= max_mb * 1_000_000]
+    print(f"Cipher matrix up to {sizes[-1] / 1e6:g} MB: engines {', '.join(engines)}")
+    for mix in mixes or CORPORA:
+        alphabet = CORPORA[mix]
+        bytes_per_char = len(alphabet.encode("utf-8")) / len(alphabet)
+        for size in sizes:
+            text = generate_corpus(alphabet, int(size / bytes_per_char))
+            text_bytes = len(text.encode("utf-8"))
+            for key_set in key_sets or KEY_SETS:
+                for engine in engines:
+                    totals = {}
+                    for n, m in KEY_SETS[key_set]:
+                        functions = ENGINES[engine](n, m)
+                        encrypted = functions["encrypt"](text)
+                        for operation, run in (("build", functions["build"]),
+                                               ("encrypt", lambda: functions["encrypt"](text)),
+                                               ("decrypt", lambda: functions["decrypt"](encrypted))):
+                            if operation == "build" and size != sizes[0]:
+                                continue  # Table build does not depend on the input; time it once
+                            result = measure(run, repeats=3 if size <= 10_000_000 else 1)
+                            for name, value in result.items():
+                                totals.setdefault(operation, {}).setdefault(name, []).append(value)
+                    for operation, values in totals.items():
+                        row = {"engine": engine, "operation": operation, "mix": mix, "keys": key_set,
+                               "bytes": 0 if operation == "build" else text_bytes}
+                        row.update({name: sum(items) / len(items) for name, items in values.items()})
+                        row["mb_per_s"] = row["bytes"] / row["seconds"] / 1e6 if row["bytes"] else None
+                        rows.append(row)
+                        speed = f"{row['mb_per_s']:9.1f} MB/s" if row["bytes"] else f"{row['seconds'] * 1e6:9.1f} us  "
+                        print(f"  {engine:<6} {operation:<8} {mix:<14} {key_set:<7} {row['bytes'] / 1e6:10.3f} MB "
+                              f"{speed} peak {row['peak_bytes'] / 1e6:9.2f} MB {row['blocks']:6.0f} blocks")
+    return rows
+
+
+def random_text(rng, length):
+    # Random text drawing on ASCII letters and symbols, control characters, Latin-1, the rest of the BMP,
+    # astral code points and lone surrogates (which the cipher must pass through unchanged)
+    pools = [(32, 127), (0, 32), (128, 256), (256, 0xD800), (0xD800, 0xE000), (0xE000, 0x10000),
+             (0x10000, 0x110000)]
+    weights = [60, 5, 10, 10, 2, 5, 8]
+    return "".join(chr(rng.randrange(*rng.choices(pools, weights)[0])) for _ in range(length))
+
+
+def roundtrip_failures(text, n, m):
+    # Names of the cipher properties text breaks under key (n, m), or [] if it keeps them all
+    failures = []
+    encrypted = cipher.encrypt_text(text, n, m)
+    if cipher.decrypt_text(encrypted, n, m) != text:
+        failures.append("decrypt(encrypt(text)) != text")
+    if encrypted != text.translate(cipher.build_translation_table(n, m)):
+        failures.append("encrypt_text differs from str.translate with build_translation_table")
+    if len(encrypted) != len(text):
+        failures.append("length changed")
+    if cipher.encrypt_text(text, n + 13 * 7, m - 13 * 3) != encrypted:
+        failures.append("equivalent key gave different output")
+    data = text.encode("utf-8", "surrogatepass")
+    if cipher.get_cipher(n, m).encrypt_bytes(data) != encrypted.encode("utf-8", "surrogatepass"):
+        failures.append("encrypt_bytes differs from encrypt_text")
+    return failures
+
+
+def shrink(text, n, m):
+    # Smallest text found (by dropping ever smaller pieces) that still breaks a property, for the report
+    piece = len(text) // 2
+    while piece >= 1:
+        start = 0
+        while start < len(text):
+            candidate = text[:start] + text[start + piece:]
+            if candidate and roundtrip_failures(candidate, n, m):
+                text = candidate
+            else:
+                start += piece
+        piece //= 2
+    return text
+
+
+def check_roundtrip(cases_per_key=20, max_length=300, seed=0):
+    # Property check over the whole key space: every one of the 169 key classes, each under a random
+    # representative (n + 13i, m + 13j), on random texts. Returns a summary with any failures, shrunk.
+    rng = random.Random(seed)
+    failures = []
+    cases = 0
+    start = time.perf_counter()
+    for n0 in range(13):
+        for m0 in range(13):
+            n = n0 + 13 * rng.randint(-10 ** 6, 10 ** 6)
+            m = m0 + 13 * rng.randint(-10 ** 6, 10 ** 6)
+            for _ in range(cases_per_key):
+                text = random_text(rng, rng.randint(0, max_length))
+                cases += 1
+                broken = roundtrip_failures(text, n, m)
+                if broken:
+                    failures.append({"n": n, "m": m, "properties": broken, "text": ascii(shrink(text, n, m))})
+    seconds = time.perf_counter() - start
+    print(f"Round-trip check: {cases} random texts over all 169 key classes in {seconds:.2f}s, "
+          f"{len(failures)} failures")
+    for failure in failures[:10]:
+        print(f"  key ({failure['n']}, {failure['m']}): {'; '.join(failure['properties'])} on {failure['text']}")
+    return {"keys": 169, "cases": cases, "seed": seed, "seconds": seconds, "failures": failures}
+
+
+def compare_results(rows, path):
+    # Print this run's speed against an earlier --json file, matching rows on everything but the timings
+    with open(path, "r", encoding="utf-8") as f:
+        previous = json.load(f)
+    fields = ("engine", "operation", "mix", "keys", "bytes")
+    earlier = {tuple(row[field] for field in fields): row for row in previous.get("matrix", [])}
+    print(f"Compared with {path} ({previous.get('label') or 'unlabelled'})")
+    for row in rows:
+        match = earlier.get(tuple(row[field] for field in fields))
+        if match:
+            print(f"  {row['engine']:<6} {row['operation']:<8} {row['mix']:<14} {row['keys']:<7} "
+                  f"{row['bytes'] / 1e6:10.3f} MB  x{match['seconds'] / row['seconds']:.2f} speed")
+
+
+def save_results(path, label, rows, roundtrip):
+    results = {"label": label, "python": platform.python_version(), "platform": platform.platform(),
+               "cpus": os.cpu_count(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+               "matrix": rows, "roundtrip": roundtrip}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+        f.write("\n")
+    print(f"Results saved to {path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for 'Assingnment 2 Question 1.py'")
+    parser.add_argument("suite", nargs="?", default="all",
+                        choices=["all", "throughput", "unicode", "streaming", "bulk", "matrix", "roundtrip"])
+    parser.add_argument("--size-mb", type=int, default=256, help="size of the generated text")
+    parser.add_argument("--file-mb", type=int, default=1024, help="size of the generated file for streaming and bulk")
+    parser.add_argument("--max-mb", type=int, default=100, help="largest matrix input (1024 reaches 1 GB)")
+    parser.add_argument("--mixes", nargs="+", choices=list(CORPORA), help="character mixes for the matrix")
+    parser.add_argument("--keys", nargs="+", choices=list(KEY_SETS), help="key sets for the matrix")
+    parser.add_argument("--engines", nargs="+", choices=list(ENGINES), default=["table"],
+                        help="engine variants for the matrix")
+    parser.add_argument("--cases", type=int, default=20, help="random texts per key class in the round-trip check")
+    parser.add_argument("--json", help="save matrix and round-trip results to this JSON file")
+    parser.add_argument("--label", help="name of this variant in the saved results")
+    parser.add_argument("--compare", help="JSON file of an earlier run to compare the matrix against")
+    args = parser.parse_args(argv)
+    if args.suite in ("all", "throughput"):
+        benchmark_throughput(args.size_mb)
+    if args.suite in ("all", "unicode"):
+        benchmark_unicode(args.size_mb * 100_000)
+    if args.suite in ("all", "streaming"):
+        benchmark_streaming(args.file_mb)
+    if args.suite in ("all", "bulk"):
+        benchmark_bulk(args.file_mb)
+    rows, roundtrip = [], None
+    if args.suite in ("all", "matrix"):
+        rows = benchmark_matrix(args.max_mb, args.mixes, args.keys, args.engines)
+        if args.compare:
+            compare_results(rows, args.compare)
+    if args.suite in ("all", "roundtrip"):
+        roundtrip = check_roundtrip(args.cases)
+    if args.json and (rows or roundtrip):
+        save_results(args.json, args.label, rows, roundtrip)
+    return 1 if roundtrip and roundtrip["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
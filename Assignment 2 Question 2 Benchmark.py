@@ -0,0 +1,442 @@
+import argparse  # Used for the command line
+import asyncio  # Used for the async entry point benchmark and its HTTP stand-in
+import bisect  # Used to find the true rank of a sketch's answer
+import functools  # Used to serve the generated archive from its directory
+import http.server  # Used to serve generated files over loopback HTTP when timing the fetch stage
+import importlib.util  # Used to load the analysis script, whose file name is not a valid module name
+import json  # Used for baseline files
+import os  # Used for paths
+import random  # Used to generate synthetic temperatures
+import sys  # Used to register the loaded module
+import tempfile  # Used for scratch directories
+import threading  # Used to run the loopback HTTP server
+import time  # Used for timings
+import tracemalloc  # Used to measure peak Python memory
+from concurrent.futures import ProcessPoolExecutor  # Used to run each scenario in a fresh process for peak RSS
+from contextlib import redirect_stdout  # Used to silence per-file progress output
+from io import StringIO, TextIOWrapper  # Used to compare whole-file and streaming parsing
+try:
+    import resource  # Used for peak RSS (not available on Windows)
+except ImportError:
+    resource = None
+
+"""Benchmarks for 'Assignment 2 Question 2.py'.
+Run directly: python "Assignment 2 Question 2 Benchmark.py" [suite] [options]; see --help.
+Everything runs offline against generated stations_group_*.csv files; http-check serves the bundled
+temperature_data/ from a loopback server.
+"""
+
+
+def load_analysis():
+    # Import "Assignment 2 Question 2.py" as a module named temperature_analysis
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Assignment 2 Question 2.py")
+    spec = importlib.util.spec_from_file_location("temperature_analysis", path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["temperature_analysis"] = module  # Needed so worker processes can unpickle its functions
+    spec.loader.exec_module(module)
+    return module
+
+
+analysis = load_analysis()
+
+
+def generate_station_file(path, rows, stations=1000, missing_rate=0.02, seed=0):
+    # Write one stations_group_*.csv-shaped file with the given number of rows, cycling through a fixed set
+    # of stations (so the aggregates stay the same size however many rows there are)
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("STATION_NAME,STN_ID,LAT,LON," + ",".join(analysis.MONTHS) + "\n")
+        for i in range(rows):
+            station = i % stations
+            base = 10 + station % 25
+            cells = ["" if rng.random() < missing_rate else f"{base + rng.gauss(0, 4):.2f}" for _ in range(12)]
+            f.write(f"STATION-{station:05d},{10000 + station},{-44 + station % 34},{113 + station % 41},"
+                    + ",".join(cells) + "\n")
+
+
+def generate_archive(directory, stations=1000, years=20, first_year=1986, missing_rate=0.02, seed=0):
+    # Write one stations_group_<year>.csv file per year, each listing the same stations
+    rng = random.Random(seed)
+    bases = [rng.uniform(10, 35) for _ in range(stations)]
+    os.makedirs(directory, exist_ok=True)
+    for year in range(first_year, first_year + years):
+        with open(os.path.join(directory, f"stations_group_{year}.csv"), "w", encoding="utf-8", newline="") as f:
+            f.write("STATION_NAME,STN_ID,LAT,LON," + ",".join(analysis.MONTHS) + "\n")
+            for i, base in enumerate(bases):
+                cells = ["" if rng.random() < missing_rate else f"{base + rng.gauss(0, 4):.2f}" for _ in range(12)]
+                f.write(f"STATION-{i:05d},{10000 + i},{-44 + i % 34 + 0.5},{113 + i % 41 + 0.5},"
+                        + ",".join(cells) + "\n")
+
+
+def timed(function, *args, **kwargs):
+    # Run function quietly and return (seconds, result)
+    with redirect_stdout(StringIO()):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        return time.perf_counter() - start, result
+
+
+def peak_memory(function, *args):
+    # Run function(*args) and return the peak traced Python allocation in bytes (tracing slows it down a lot)
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def parse_whole_file(path):
+    # The previous approach: read and decode the whole file, copy it into a StringIO, then parse
+    with open(path, "rb") as f:
+        file = StringIO(f.read().decode('utf-8'))
+    analysis.fold_csv_file(file, path, *analysis.new_aggregates())
+
+
+def parse_streaming(path):
+    # The streaming approach used by process_temperature_data
+    with open(path, "rb") as f:
+        analysis.fold_csv_file(TextIOWrapper(f, encoding='utf-8', newline=''), path, *analysis.new_aggregates())
+
+
+def benchmark_memory(row_counts=(10_000, 50_000, 200_000)):
+    # Peak memory of whole-file vs streaming parsing as a single file grows
+    print("Peak memory while parsing one file (tracemalloc)")
+    print(f"{'rows':>10} {'file MB':>9} {'whole-file MB':>14} {'streaming MB':>13}")
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in row_counts:
+            path = os.path.join(directory, f"stations_group_{rows}.csv")
+            generate_station_file(path, rows)
+            size = os.path.getsize(path) / 1e6
+            whole = peak_memory(parse_whole_file, path)
+            streaming = peak_memory(parse_streaming, path)
+            print(f"{rows:>10} {size:>9.1f} {whole / 1e6:>14.1f} {streaming / 1e6:>13.2f}")
+            os.remove(path)
+
+
+def benchmark_column_store(stations=10_000, years=20):
+    # Cold (parse CSVs and build the store) vs warm (memory-map the store) runs against plain CSV parsing
+    print(f"Column store: {stations} stations x {years} years")
+    with tempfile.TemporaryDirectory() as directory:
+        data_dir = os.path.join(directory, "data")
+        store_dir = os.path.join(directory, "store")
+        generate_archive(data_dir, stations, years)
+        csv_seconds, expected = timed(analysis.process_temperature_data, [data_dir], cache_dir=None, engine="numpy")
+        cold_seconds, cold = timed(analysis.process_temperature_data, [data_dir], cache_dir=None,
+                                   column_store=store_dir)
+        warm_seconds, warm = timed(analysis.process_temperature_data, [data_dir], cache_dir=None,
+                                   column_store=store_dir)
+        print(f"  numpy engine, CSV parse : {csv_seconds:7.3f}s")
+        print(f"  column store, cold      : {cold_seconds:7.3f}s")
+        print(f"  column store, warm      : {warm_seconds:7.3f}s")
+        print(f"  results identical       : {cold == warm == expected}")
+
+
+def benchmark_station_index(stations=10_000, years=20, repeats=1000):
+    # Average latency of each StationIndex query once the index is built
+    print(f"Station index: {stations} stations x {years} years")
+    with tempfile.TemporaryDirectory() as directory:
+        generate_archive(directory, stations, years)
+        build_seconds, index = timed(analysis.StationIndex.from_sources, [directory], cache_dir=None)
+        print(f"  build                   : {build_seconds:7.3f}s")
+        queries = [("series", index.series, ("STATION-00042",)),
+                   ("bbox (10 x 10 degrees)", index.bbox, (-40, -30, 120, 130)),
+                   ("top_k", index.top_k, (10,)),
+                   ("top_k for one year", index.top_k, (10, False, 1990))]
+        for label, query, args in queries:
+            query(*args)  # Warm up (builds the lazily ranked lists)
+            start = time.perf_counter()
+            for _ in range(repeats):
+                query(*args)
+            print(f"  {label:<24}: {(time.perf_counter() - start) / repeats * 1e3:7.3f}ms")
+
+
+def peak_rss():
+    # Peak resident set size of this process in bytes, or None where the resource module is unavailable
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux reports kilobytes, macOS bytes
+
+
+def serve_directory(directory):
+    # Serve directory on a loopback port in a background thread; returns (server, base URL)
+    handler = functools.partial(QuietHandler, directory=directory)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real downloads
+
+    def log_message(self, format, *args):
+        pass  # No per-request log lines
+
+
+def check_http_fetch(data_dir=None, engines=("python", "numpy"), max_workers=8):
+    # Serve temperature_data/ over a loopback keep-alive HTTP stand-in and check that the concurrent fetch
+    # gives exactly the result tuple of reading the same files from disk; returns True when every engine matches
+    data_dir = data_dir or os.path.join(os.path.dirname(os.path.abspath(__file__)), "temperature_data")
+    paths = analysis.resolve_sources([data_dir])
+    server, base = serve_directory(data_dir)
+    urls = [base + os.path.basename(path) for path in paths]
+    print(f"HTTP fetch check: {len(urls)} files from {data_dir} served at {base}")
+    ok = True
+    try:
+        for engine in engines:
+            with redirect_stdout(StringIO()):
+                local = analysis.process_temperature_data(paths, cache_dir=None, engine=engine)
+                start = time.perf_counter()
+                fetched = analysis.process_temperature_data(urls, max_workers=max_workers, cache_dir=None,
+                                                            engine=engine)
+                seconds = time.perf_counter() - start
+            same = repr(fetched) == repr(local)  # repr so that NaN values compare equal
+            ok = ok and same
+            print(f"  {engine:<7} {seconds:7.3f}s over HTTP, {'identical to' if same else 'DIFFERENT from'} local files")
+    finally:
+        server.shutdown()
+        server.server_close()
+    return ok
+
+
+def run_stages(sources, engine, output_dir):
+    # Run the pipeline one stage at a time and return {stage: seconds}:
+    # fetch (download or read every file), parse (per-file parsing; the Python engine also folds each
+    # cell into the running totals here), aggregate (final averages, ranges and extremes), write (save_results)
+    seconds = {}
+    start = time.perf_counter()
+    contents = [(url, content) for url, content, error in analysis.fetch_files(sources, cache=None)
+                if error is None]
+    seconds["fetch"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if engine == "numpy":
+        parsed = [analysis.parse_csv_array(content.decode('utf-8'), url) for url, content in contents]
+    else:
+        aggregates = analysis.new_aggregates()
+        for url, content in contents:
+            analysis.fold_csv_file(StringIO(content.decode('utf-8'), newline=''), url, *aggregates)
+    seconds["parse"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = analysis.summarise_arrays(parsed) if engine == "numpy" else analysis.summarise_aggregates(*aggregates)
+    seconds["aggregate"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    analysis.save_results(*results, *(os.path.join(output_dir, name) for name in
+                                      ("average_temp.txt", "largest_temp_range_station.txt",
+                                       "warmest_and_coolest_station.txt")))
+    seconds["write"] = time.perf_counter() - start
+    return seconds
+
+
+def run_scenario(engine, stations, years, missing_rate, http):
+    # Generate an archive, time each stage and report throughput; meant to run in a fresh process so the
+    # peak RSS belongs to this scenario alone
+    with tempfile.TemporaryDirectory() as directory:
+        data_dir = os.path.join(directory, "data")
+        generate_archive(data_dir, stations, years, missing_rate=missing_rate)
+        sources = analysis.resolve_sources([data_dir])
+        server = None
+        if http:
+            server, base = serve_directory(data_dir)
+            sources = [base + os.path.basename(path) for path in sources]
+        try:
+            with redirect_stdout(StringIO()):
+                seconds = run_stages(sources, engine, directory)
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+    cells = stations * years * 12  # Every cell, missing or not, is read
+    total = sum(seconds.values())
+    return {"seconds": seconds, "total": total, "cells": cells,
+            "parse_cells_per_s": cells / seconds["parse"], "cells_per_s": cells / total, "peak_rss": peak_rss()}
+
+
+def scenario_name(engine, stations, years, missing_rate, http):
+    return f"{engine} {stations}x{years} missing={missing_rate:g}{' http' if http else ''}"
+
+
+def benchmark_pipeline(stations=(1000, 10_000), years=20, missing_rate=0.02, engines=("python", "numpy"),
+                       http=False, baseline=None, save_baseline=False, tolerance=0.25):
+    # Time each stage for every engine/size combination; compare with (or save) a baseline file and
+    # return the names of scenarios that got slower than the baseline by more than tolerance
+    if analysis.np is None:
+        engines = [engine for engine in engines if engine != "numpy"]
+    previous = {}
+    if baseline and os.path.exists(baseline) and not save_baseline:
+        with open(baseline, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+
+    print("Pipeline stages (seconds), throughput and peak RSS")
+    print(f"{'scenario':<36} {'fetch':>7} {'parse':>7} {'aggr':>7} {'write':>7} {'Mcells/s':>9} {'RSS MB':>7}")
+    results, regressions = {}, []
+    for engine in engines:
+        for count in stations:
+            name = scenario_name(engine, count, years, missing_rate, http)
+            with ProcessPoolExecutor(max_workers=1) as pool:  # Fresh process per scenario
+                result = results[name] = pool.submit(run_scenario, engine, count, years, missing_rate, http).result()
+            seconds = result["seconds"]
+            rss = f"{result['peak_rss'] / 1e6:7.0f}" if result["peak_rss"] else f"{'n/a':>7}"
+            line = (f"{name:<36} {seconds['fetch']:7.3f} {seconds['parse']:7.3f} {seconds['aggregate']:7.3f} "
+                    f"{seconds['write']:7.3f} {result['cells_per_s'] / 1e6:9.2f} {rss}")
+            before = previous.get(name)
+            if before:
+                change = result["total"] / before["total"] - 1
+                line += f"  {change:+.0%} vs baseline"
+                if change > tolerance:
+                    line += "  REGRESSION"
+                    regressions.append(name)
+            print(line)
+
+    if baseline and save_baseline:
+        analysis.atomic_write_bytes(baseline, json.dumps(results, indent=2).encode("utf-8"))
+        print(f"Baseline saved to {baseline}")
+    return regressions
+
+
+async def serve_directory_async(directory, delay=0.0):
+    # Minimal asyncio HTTP/1.1 stand-in (GET only, keep-alive) serving directory with an optional per-request
+    # delay; returns (server, base URL). Runs on the caller's event loop.
+    async def handle(reader, writer):
+        try:
+            while True:
+                request = await reader.readuntil(b"\r\n\r\n")
+                path = request.split(b" ", 2)[1].decode("ascii").lstrip("/")
+                await asyncio.sleep(delay)
+                file_path = os.path.join(directory, os.path.basename(path))
+                if os.path.isfile(file_path):
+                    with open(file_path, "rb") as f:
+                        body = f.read()
+                    writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % len(body) + body)
+                else:
+                    writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass  # Client closed the connection, or the loop is shutting down
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/"
+
+
+async def measure_async(sources, engine, max_workers):
+    # Run process_temperature_data_async while a ticker measures the worst event loop stall
+    worst_lag = 0.0
+    done = asyncio.Event()
+
+    async def ticker(interval=0.005):
+        nonlocal worst_lag
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            worst_lag = max(worst_lag, time.perf_counter() - start - interval)
+
+    ticking = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    with redirect_stdout(StringIO()):
+        result = await analysis.process_temperature_data_async(sources, max_workers=max_workers, cache_dir=None,
+                                                               engine=engine)
+    seconds = time.perf_counter() - start
+    done.set()
+    await ticking
+    return seconds, worst_lag, result
+
+
+def benchmark_async(stations=2000, years=20, delay=0.05, max_workers=8, engines=("python", "numpy")):
+    # The async entry point against the asyncio HTTP stand-in: wall time, worst event loop stall, and
+    # whether it returns the same tuple as process_temperature_data
+    if analysis.np is None:
+        engines = [engine for engine in engines if engine != "numpy"]
+    print(f"Async entry point: {stations} stations x {years} files, {delay * 1e3:.0f}ms per request")
+    with tempfile.TemporaryDirectory() as directory:
+        generate_archive(directory, stations, years)
+        names = [os.path.basename(path) for path in analysis.resolve_sources([directory])]
+
+        async def run(engine):
+            server, base = await serve_directory_async(directory, delay)
+            async with server:
+                sources = [base + name for name in names] + [base + "missing.csv"]  # One failing download
+                measured = await measure_async(sources, engine, max_workers)
+                # The blocking entry point, in a thread so the stand-in keeps serving
+                expected = await asyncio.to_thread(timed, analysis.process_temperature_data, sources,
+                                                   max_workers=max_workers, cache_dir=None, engine=engine)
+            return measured, expected
+
+        for engine in engines:
+            (seconds, worst_lag, result), (sync_seconds, expected) = asyncio.run(run(engine))
+            print(f"  {engine:<6} async {seconds:7.3f}s (worst loop stall {worst_lag * 1e3:5.1f}ms)"
+                  f"  blocking {sync_seconds:7.3f}s  results identical: {result == expected}")
+
+
+def rank_error(exact_store, value, q):
+    # |true rank of value - q| against the exact store's sorted values
+    exact_store.quantile(q)  # Makes sure the values are sorted
+    values = exact_store.values
+    low, high = bisect.bisect_left(values, value), bisect.bisect_right(values, value)
+    target = q * len(values)
+    return 0.0 if low <= target <= high else min(abs(low - target), abs(high - target)) / len(values)
+
+
+def benchmark_quantiles(stations=10_000, years=20, engine="python", k=200, qs=(0.05, 0.25, 0.5, 0.75, 0.95)):
+    # Exact vs KLL sketch quantiles: run time, memory held by the stores, and the sketch's worst rank error
+    print(f"Quantiles: {stations} stations x {years} years ({engine} engine, k={k})")
+    with tempfile.TemporaryDirectory() as directory:
+        generate_archive(directory, stations, years)
+        base_seconds, _ = timed(analysis.process_temperature_data, [directory], cache_dir=None, engine=engine)
+        stats = {}
+        for mode in ("exact", "sketch"):
+            stats[mode] = analysis.QuantileStats(mode, k)
+            seconds, _ = timed(analysis.process_temperature_data, [directory], cache_dir=None, engine=engine,
+                               quantiles=stats[mode])
+            query_seconds, _ = timed(stats[mode].quantiles, qs)
+            print(f"  {mode:<6}: run {seconds:7.3f}s (without quantiles {base_seconds:.3f}s), "
+                  f"query {query_seconds:6.3f}s, {stats[mode].nbytes() / 1e6:8.2f} MB held")
+    exact, sketch = stats["exact"], stats["sketch"]
+    for label, exact_table, sketch_table in (("seasons", exact.seasons, sketch.seasons),
+                                             ("stations", exact.stations, sketch.stations)):
+        worst = max(rank_error(exact_table[key], sketch_table[key].quantile(q), q)
+                    for key in exact_table if exact_table[key].count() for q in qs)
+        print(f"  sketch worst rank error over {label}: {worst:.4f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for 'Assignment 2 Question 2.py'")
+    parser.add_argument("suite", nargs="?", default="all", choices=["all", "pipeline", "memory", "column-store", "index", "async", "quantiles", "http-check"])
+    parser.add_argument("--stations", type=int, nargs="+", default=[1000, 10_000], help="station counts to generate")
+    parser.add_argument("--years", type=int, default=20, help="files (one per year) to generate")
+    parser.add_argument("--missing-rate", type=float, default=0.02, help="fraction of empty temperature cells")
+    parser.add_argument("--engine", nargs="+", default=["python", "numpy"], choices=["python", "numpy"])
+    parser.add_argument("--http", action="store_true", help="fetch the generated files from a loopback HTTP server")
+    parser.add_argument("--baseline", help="JSON file of earlier pipeline results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="write this run's results to --baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="slowdown that counts as a regression")
+    args = parser.parse_args(argv)
+
+    regressions = []
+    if args.suite in ("all", "pipeline"):
+        regressions = benchmark_pipeline(args.stations, args.years, args.missing_rate, args.engine, args.http,
+                                         args.baseline, args.save_baseline, args.tolerance)
+    if args.suite in ("all", "memory"):
+        benchmark_memory()
+    if args.suite in ("all", "column-store"):
+        benchmark_column_store(max(args.stations), args.years)
+    if args.suite in ("all", "index"):
+        benchmark_station_index(max(args.stations), args.years)
+    if args.suite in ("all", "async"):
+        benchmark_async(min(args.stations), args.years, engines=args.engine)
+    if args.suite in ("all", "quantiles"):
+        benchmark_quantiles(max(args.stations), args.years, args.engine[0])
+    if args.suite in ("all", "http-check") and not check_http_fetch(engines=args.engine):
+        print("HTTP fetch check failed: results differ from the local files")
+        return 1
+    if regressions:
+        print(f"Slower than baseline: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
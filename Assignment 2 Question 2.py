@@ -1,6 +1,37 @@
+import argparse  # Used for the command line
+import array  # Used for compact float storage in the quantile stores
+import asyncio  # Used for the async entry point
+import collections  # Used for the async download window
+import contextlib  # Used for optional stage timers
+import cProfile  # Used by --profile
 import csv  # Used to read CSV files
-import urllib.request  # Used to fetch files from URLs
-from io import StringIO  # Used to treat string data as a file-like object
+import fnmatch  # Used to match file names in watch mode
+import glob  # Used to expand wildcard source patterns
+import hashlib  # Used to content-address cached downloads
+import itertools  # Used to take the next sources to download
+import http.client  # Used for keep-alive HTTP(S) connections
+import http.server  # Used for the watch mode's JSON endpoint
+import json  # Used for the download cache index
+import locale  # Used to encode the text result files like open() does
+import math  # Used for exact sums and grid cells in the station index
+import os  # Used for local paths and atomic cache writes
+import pstats  # Used to print the --profile report
+import re  # Used to mark empty cells for the NumPy engine
+import shutil  # Used to replace the column store directory
+import sys  # Used for the exit status and --profile output
+import tempfile  # Used to write cache entries atomically
+import threading  # Used to keep one connection pool per worker thread
+import time  # Used for retry back-off, per-file deadlines and run metrics
+import urllib.error  # Used to report fetch failures
+import urllib.parse  # Used to split URLs into host and path
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor  # Used to fetch/reduce files concurrently
+from fractions import Fraction  # Used for the exact engine's variance
+from io import BytesIO, StringIO, TextIOWrapper  # Used to read bytes and strings as file-like objects
+
+try:
+    import numpy as np  # Optional: only needed for the vectorised engine
+except ImportError:
+    np = None
 
 """Aims:
 1. Calculate average temperatures for each season across all years and save to 'average_temp.txt'.
@@ -20,14 +51,348 @@ def find_season(month_name):
     return seasons.get(month_name)  # Returns season or None if month_name not found
 
 
-def process_temperature_data(file_urls):
+# Per-thread pool of open connections keyed by (scheme, host), so each worker reuses its TLS session
+_connection_pool = threading.local()
+
+
+def get_connection(scheme, host, timeout):
+    connections = getattr(_connection_pool, "connections", None)
+    if connections is None:  # First request made by this thread
+        connections = _connection_pool.connections = {}
+    conn = connections.get((scheme, host))
+    if conn is None:  # Open a new keep-alive connection for this host
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(host, timeout=timeout)
+        else:
+            conn = http.client.HTTPConnection(host, timeout=timeout)
+        connections[(scheme, host)] = conn
+    return conn
+
+
+def drop_connection(scheme, host):
+    # Close and forget a connection that failed, so the next attempt opens a fresh one
+    connections = getattr(_connection_pool, "connections", {})
+    conn = connections.pop((scheme, host), None)
+    if conn is not None:
+        conn.close()
+
+
+def fetch_url(url, timeout=30, retries=3, max_redirects=5, headers=None, sink=None):
+    # Fetch one URL over a pooled connection, retrying transient failures with back-off.
+    # Returns (status, response headers, body); status is 200, or 304 for a conditional request.
+    # With a writable binary sink the body is streamed into it chunk by chunk and body is None.
+    last_error = None
+    for attempt in range(retries + 1):
+        if attempt:
+            time.sleep(min(2 ** (attempt - 1) * 0.5, 8))  # 0.5s, 1s, 2s ... between attempts
+        target = url
+        if sink is not None:  # Discard whatever a failed attempt wrote
+            sink.seek(0)
+            sink.truncate()
+        try:
+            for _ in range(max_redirects + 1):
+                parts = urllib.parse.urlsplit(target)
+                if parts.scheme not in ("http", "https"):
+                    raise urllib.error.URLError(f"unsupported URL scheme '{parts.scheme}'")
+                path = parts.path or "/"
+                if parts.query:
+                    path += "?" + parts.query
+                conn = get_connection(parts.scheme, parts.netloc, timeout)
+                deadline = time.monotonic() + timeout  # Whole-file deadline, not just per socket read
+                try:
+                    conn.request("GET", path, headers={"Connection": "keep-alive", **(headers or {})})
+                    response = conn.getresponse()
+                    chunks = []
+                    while True:
+                        chunk = response.read(64 * 1024)
+                        if not chunk:
+                            break
+                        if sink is not None and response.status == 200:
+                            sink.write(chunk)
+                        else:
+                            chunks.append(chunk)
+                        if time.monotonic() > deadline:
+                            raise TimeoutError(f"timed out after {timeout}s")
+                except (OSError, http.client.HTTPException):
+                    drop_connection(parts.scheme, parts.netloc)
+                    raise
+                if response.will_close:  # Server refused keep-alive
+                    drop_connection(parts.scheme, parts.netloc)
+                if response.status in (301, 302, 303, 307, 308) and response.getheader("Location"):
+                    target = urllib.parse.urljoin(target, response.getheader("Location"))
+                    continue  # Follow the redirect
+                if response.status == 304 and headers:  # Cached copy is still current
+                    return response.status, response.headers, b""
+                if response.status != 200:
+                    error = urllib.error.HTTPError(url, response.status, response.reason, response.headers, None)
+                    if response.status < 500 and response.status != 429:
+                        raise error  # Client errors will not fix themselves, so do not retry
+                    last_error = error
+                    break
+                return response.status, response.headers, None if sink is not None else b"".join(chunks)
+            else:
+                raise urllib.error.URLError(f"too many redirects for {url}")
+        except urllib.error.HTTPError:
+            raise
+        except urllib.error.URLError as e:
+            last_error = e
+        except (OSError, http.client.HTTPException) as e:
+            last_error = urllib.error.URLError(e)
+    raise last_error
+
+
+def is_url(source):
+    return urllib.parse.urlsplit(source).scheme in ("http", "https")
+
+
+def resolve_sources(sources):
+    # Expand directories and glob patterns into individual CSV files; URLs are kept as they are
+    if isinstance(sources, str):
+        sources = [sources]
+    resolved = []
+    for source in sources:
+        source = os.fspath(source)
+        if is_url(source):
+            resolved.append(source)
+        elif os.path.isdir(source):  # Every CSV file in the directory, in name order (i.e. year order)
+            resolved.extend(sorted(glob.glob(os.path.join(source, "*.csv"))))
+        elif glob.has_magic(source):
+            matches = sorted(glob.glob(source))
+            if not matches:
+                print(f"Warning: no files match {source}.")
+            resolved.extend(matches)
+        else:
+            resolved.append(source)  # Plain path; a missing file is reported when it is read
+    return resolved
+
+
+# Default location of the download cache, shared between runs
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "hit137_temperature_data")
+
+
+class DownloadCache:
+    """On-disk cache of downloaded files.
+
+    Bodies are stored once under their SHA-256 (``blobs/<hash>``) and ``index.json`` maps each URL to
+    its blob plus the ETag/Last-Modified validators it was served with. The least recently used
+    entries are evicted once the blobs exceed ``max_bytes``. Runs sharing a cache directory merge their
+    changes into ``index.json`` when they save, rather than overwriting each other's entries.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.blob_dir = os.path.join(directory, "blobs")
+        self.index_path = os.path.join(directory, "index.json")
+        self.lock = threading.Lock()  # Worker threads share the index
+        self.evicted = set()  # URLs this run evicted, so save() does not bring them back from disk
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self.index = self.read_index()
+
+    def read_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}  # Missing or corrupt index; start empty
+
+    def blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest)
+
+    def lookup(self, url):
+        # Return the index entry for url if its blob is still on disk, otherwise None
+        with self.lock:
+            entry = self.index.get(url)
+            if entry is None or not os.path.exists(self.blob_path(entry["sha256"])):
+                return None
+            entry["used"] = time.time()
+            return dict(entry)
+
+    def open(self, entry):
+        return open(self.blob_path(entry["sha256"]), "rb")
+
+    def read(self, entry):
+        with self.open(entry) as f:
+            return f.read()
+
+    def new_blob(self):
+        # Temporary file in the blob directory for a download in progress; pass it to commit() when complete
+        return tempfile.NamedTemporaryFile(dir=self.blob_dir, prefix=".tmp-", delete=False)
+
+    def commit(self, url, blob, response_headers):
+        # Hash a finished download, move it to its content address and index it; returns the blob opened for reading.
+        # The blob is opened before it is indexed, so evicting it (a download larger than max_bytes, or another
+        # worker making room) cannot pull it away from the caller.
+        blob.flush()
+        blob.seek(0)
+        digest = hashlib.sha256()
+        size = 0
+        for chunk in iter(lambda: blob.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+            size += len(chunk)
+        blob.close()
+        digest = digest.hexdigest()
+        path = self.blob_path(digest)
+        try:
+            f = open(path, "rb")  # Identical content from another URL is stored only once
+            os.remove(blob.name)
+        except FileNotFoundError:
+            os.replace(blob.name, path)
+            f = open(path, "rb")
+        self.add(url, digest, size, response_headers)
+        return f
+
+    def store(self, url, content, response_headers):
+        digest = hashlib.sha256(content).hexdigest()
+        path = self.blob_path(digest)
+        if not os.path.exists(path):  # Identical content from another URL is stored only once
+            atomic_write_bytes(path, content)
+        self.add(url, digest, len(content), response_headers)
+
+    def add(self, url, digest, size, response_headers):
+        with self.lock:
+            self.index[url] = {
+                "sha256": digest,
+                "size": size,
+                "etag": response_headers.get("ETag"),
+                "last_modified": response_headers.get("Last-Modified"),
+                "used": time.time(),
+            }
+            self.evicted.discard(url)
+            self.evict()
+
+    def evict(self):
+        # Drop least recently used URLs until the blobs fit in max_bytes (caller holds the lock)
+        sizes = {entry["sha256"]: entry["size"] for entry in self.index.values()}
+        total = sum(sizes.values())
+        for url, entry in sorted(self.index.items(), key=lambda item: item[1]["used"]):
+            if total <= self.max_bytes:
+                break
+            del self.index[url]
+            self.evicted.add(url)
+            if all(other["sha256"] != entry["sha256"] for other in self.index.values()):
+                total -= sizes[entry["sha256"]]
+                try:
+                    os.remove(self.blob_path(entry["sha256"]))
+                except OSError:
+                    pass  # Already gone, or still open for reading where that blocks removal
+
+    def save(self):
+        # Merge with the index on disk first, so entries added by other runs since this one started are kept;
+        # for a URL in both, the more recently used entry wins
+        with self.lock:
+            for url, entry in self.read_index().items():
+                if url in self.evicted or not os.path.exists(self.blob_path(entry["sha256"])):
+                    continue
+                if url not in self.index or entry["used"] > self.index[url]["used"]:
+                    self.index[url] = entry
+            self.evict()
+            atomic_write_bytes(self.index_path, json.dumps(self.index, indent=1).encode("utf-8"))
+
+
+def open_cache(file_urls, cache_dir=DEFAULT_CACHE_DIR, max_bytes=512 * 1024 * 1024):
+    # The download cache for a run, or None when caching is off or every source is local, so runs over
+    # local files never create the cache directory or rewrite its index
+    if cache_dir and any(is_url(source) for source in file_urls):
+        return DownloadCache(cache_dir, max_bytes)
+    return None
+
+
+def atomic_write_bytes(path, content, mode=None):
+    # Write to a temporary file in the same directory, then rename over the target
+    # mode: permission bits for the result (temporary files are created private, 0o600)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        if mode is not None:
+            os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+# Read size for streaming files, and how much of an uncached download is kept in memory before spilling to disk
+CHUNK_SIZE = 64 * 1024
+SPOOL_BYTES = 1024 * 1024
+
+
+def open_source(source, cache=None, timeout=30, retries=3, revalidate=False):
+    # Return a binary file object positioned at the start of a local file or URL; the caller closes it.
+    # Downloads are streamed to disk (the cache, or a spooled temporary file), never held whole in memory.
+    if not is_url(source):
+        try:
+            return open(source, "rb")
+        except OSError as e:
+            raise urllib.error.URLError(e)  # Reported like a failed download
+    entry = cache.lookup(source) if cache is not None else None
+    if entry is not None and not revalidate:
+        try:
+            return cache.open(entry)  # Cached files are treated as immutable: no network I/O at all
+        except FileNotFoundError:
+            entry = None  # Evicted by another worker since the lookup: download it again
+    headers = {}
+    if entry is not None:  # Ask the server whether our copy is still current
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    sink = cache.new_blob() if cache is not None else tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+    try:
+        status, response_headers, _ = fetch_url(source, timeout=timeout, retries=retries, headers=headers, sink=sink)
+    except BaseException:
+        sink.close()
+        if cache is not None:
+            os.remove(sink.name)
+        raise
+    if status == 304:
+        sink.close()
+        os.remove(sink.name)
+        try:
+            return cache.open(entry)
+        except FileNotFoundError:  # Evicted while we revalidated it: it is no longer indexed, so fetch it in full
+            return open_source(source, cache, timeout, retries, revalidate)
+    if cache is not None:
+        return cache.commit(source, sink, response_headers)
+    sink.seek(0)
+    return sink
+
+
+def load_source(source, cache=None, timeout=30, retries=3, revalidate=False):
+    # Return the raw bytes of a local file or URL, going through the download cache for URLs
+    with open_source(source, cache, timeout, retries, revalidate) as f:
+        return f.read()
+
+
+def fetch_files(sources, max_workers=8, timeout=30, retries=3, cache=None, revalidate=False, stream=False):
+    # Load all sources with a bounded pool of worker threads and yield (source, content, error) in input order.
+    # With stream=True content is an open binary file (see open_source) that the caller must close.
+    def fetch(source):
+        try:
+            if stream:
+                return source, open_source(source, cache, timeout, retries, revalidate), None
+            return source, load_source(source, cache, timeout, retries, revalidate), None
+        except urllib.error.URLError as e:
+            return source, None, e
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        # map() yields in order as results arrive, so parsing overlaps with the downloads still running
+        yield from executor.map(fetch, sources)
+    if cache is not None:
+        cache.save()
 
-    # List of all months to iterate over in each CSV row
-    months = ['January', 'February', 'March', 'April', 'May', 'June',
-              'July', 'August', 'September', 'October', 'November', 'December']
 
+# List of all months to iterate over in each CSV row
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June',
+          'July', 'August', 'September', 'October', 'November', 'December']
+
+SEASONS = ["Summer", "Autumn", "Winter", "Spring"]
+
+
+def new_aggregates():
     # Dictionary to store seasonal sums and counts for averaging later with 'sum' (total temp) and 'count' (number of temps)
-    seasonal_data = {season: {"sum": 0, "count": 0} for season in ["Summer", "Autumn", "Winter", "Spring"]}
+    seasonal_data = {season: {"sum": 0, "count": 0} for season in SEASONS}
 
     # Dictionary to track min and max temperatures for each station to calculate range 
     station_temp_ranges = {}
@@ -35,58 +400,98 @@ def process_temperature_data(file_urls):
     # Dictionary to track sum and count of temperatures for each station to calculate averages with 'sum' (total temp) and 'count' (number of temps)
     station_averages = {}
 
-    total_files = len(file_urls)  # Total number of files for progress tracking
-    for i, url in enumerate(file_urls, 1):  # Loop through each URL with index starting at 1
-        print(f"Processing file {i}/{total_files}: {url}")  # Show progress
-        try:
-            # Fetch the CSV file from the URL
-            with urllib.request.urlopen(url) as response:
-                file_content = response.read().decode('utf-8')  # Read and decode file content
-                file = StringIO(file_content)  # Convert string to file-like object
-                reader = csv.DictReader(file)  # Create a CSV reader that treats rows as dictionaries
-
-                # Check if 'STATION_NAME' column exists in the CSV
-                if 'STATION_NAME' not in reader.fieldnames:
-                    print(f"Warning: 'STATION_NAME' column missing in {url}. Skipping.")
-                    continue  # Skip this file if column is missing
-
-                # Process each row in the CSV
-                for row in reader:
-                    station = row['STATION_NAME'].strip()  # Get station name and remove whitespace
-                    if not station:  # Check for empty station names
-                        print(f"Warning: Empty station name in {url}. Skipping row.")
-                        continue  # Skip this row
-
-                    # Initialize dictionaries for this station if not already present
-                    if station not in station_temp_ranges:
-                        station_temp_ranges[station] = {"min": float('inf'), "max": float('-inf')}
-                    if station not in station_averages:
-                        station_averages[station] = {"sum": 0, "count": 0}
-
-                    # Process each month’s temperature in the row
-                    for month in months:
-                        try:
-                            temp = float(row[month])  # Convert temperature to float
-                            season = find_season(month)  # Get the season for this month
-                            if season:  # If a valid season is returned
-                                seasonal_data[season]["sum"] += temp  # Add to season total
-                                seasonal_data[season]["count"] += 1  # Increment season count
-
-                            # Update min/max for temperature range
-                            station_temp_ranges[station]["min"] = min(station_temp_ranges[station]["min"], temp)
-                            station_temp_ranges[station]["max"] = max(station_temp_ranges[station]["max"], temp)
-
-                            # Update sum and count for station average
-                            station_averages[station]["sum"] += temp
-                            station_averages[station]["count"] += 1
-
-                        except (ValueError, KeyError):
-                            continue  # Skip invalid or missing temperature data silently
+    return seasonal_data, station_temp_ranges, station_averages
 
-        except urllib.error.URLError as e:
-            print(f"Failed to fetch {url}: {e}")  # Handle URL fetch errors
-            continue  # Skip to next file
 
+def fold_csv_file(file, url, seasonal_data, station_temp_ranges, station_averages, stats=None, quantiles=None):
+    # Add every temperature in one CSV file (any text file object, read row by row) to the running aggregates
+    # stats: optional dict (see RunMetrics.new_file) that receives row/cell counts and skip reasons
+    # quantiles: optional QuantileStats that receives every temperature
+    reader = csv.reader(file)  # Rows come back as lists; columns are looked up by their header position
+    header = next(reader, None)
+
+    # Check if 'STATION_NAME' column exists in the CSV
+    if not header or 'STATION_NAME' not in header:
+        print(f"Warning: 'STATION_NAME' column missing in {url}. Skipping.")
+        if stats is not None:
+            stats["status"] = "no_station_column"
+        return  # Skip this file if column is missing
+    columns = {name: index for index, name in enumerate(header)}  # Like DictReader, a repeated name uses the last column
+    name_col = columns['STATION_NAME']
+    # (column index, season totals) for each month present, so the loop below needs no lookups
+    month_cols = [(columns[month], seasonal_data[find_season(month)]) for month in MONTHS if month in columns]
+    all_month_cols = [columns.get(month, len(header)) for month in MONTHS]  # For quantiles; absent -> past the end
+
+    rows = blank_rows = empty_names = missing = invalid = short = 0  # Counters for stats
+
+    # Process each row in the CSV
+    for row in reader:
+        if not row:
+            blank_rows += 1
+            continue  # Skip blank lines
+        station = row[name_col].strip() if name_col < len(row) else ""  # Get station name and remove whitespace
+        if not station:  # Check for empty station names
+            print(f"Warning: Empty station name in {url}. Skipping row.")
+            empty_names += 1
+            continue  # Skip this row
+        rows += 1
+
+        # Initialize dictionaries for this station if not already present
+        if station not in station_temp_ranges:
+            station_temp_ranges[station] = {"min": float('inf'), "max": float('-inf')}
+        if station not in station_averages:
+            station_averages[station] = {"sum": 0, "count": 0}
+        temps = station_temp_ranges[station]
+        totals = station_averages[station]
+
+        # Process each month’s temperature in the row
+        for col, season in month_cols:
+            try:
+                temp = float(row[col])  # Convert temperature to float
+            except ValueError:
+                if row[col].strip():
+                    invalid += 1
+                else:
+                    missing += 1
+                continue  # Skip invalid or missing temperature data
+            except IndexError:
+                short += 1
+                continue  # Short row: the month is missing
+            season["sum"] += temp  # Add to season total
+            season["count"] += 1  # Increment season count
+
+            # Update min/max for temperature range
+            if temp < temps["min"]:
+                temps["min"] = temp
+            if temp > temps["max"]:
+                temps["max"] = temp
+
+            # Update sum and count for station average
+            totals["sum"] += temp
+            totals["count"] += 1
+
+        if quantiles is not None:
+            quantiles.add_row(station, [row[col] if col < len(row) else "" for col in all_month_cols])
+
+    if stats is not None:
+        skipped_cells = missing + invalid + short
+        stats["rows"] += rows
+        stats["cells"] += rows * len(month_cols) - skipped_cells
+        add_counts(stats["skipped_rows"], blank=blank_rows, empty_station_name=empty_names)
+        add_counts(stats["skipped_cells"], missing=missing, invalid=invalid, short_row=short,
+                   missing_month_column=rows * (len(MONTHS) - len(month_cols)))
+
+
+def add_counts(counts, **reasons):
+    # Add the non-zero reason counts to a {reason: count} dict
+    for reason, count in reasons.items():
+        if count:
+            counts[reason] = counts.get(reason, 0) + count
+
+
+def summarise_aggregates(seasonal_data, station_temp_ranges, station_averages, tie_tolerance=0.0, details=None):
+    # tie_tolerance: stations within this many degrees of the largest range / warmest / coolest average also tie
+    # details: optional dict filled with {station: {"count", "average", "min", "max"}} for stations with data
     # Calculate seasonal averages
     seasonal_averages = {}
     for season, data in seasonal_data.items():
@@ -124,98 +529,1708 @@ def process_temperature_data(file_urls):
             elif avg_temp == coolest_avg:  # If tied with coolest
                 coolest_stations.append(station)  # Add to list
 
+    if tie_tolerance:  # Second pass: everything within the tolerance of each extreme
+        stations_with_largest_range = [station for station, temps in station_temp_ranges.items()
+                                       if temps["min"] != float('inf')
+                                       and temps["max"] - temps["min"] >= largest_range - tie_tolerance]
+        averages = [(station, data["sum"] / data["count"]) for station, data in station_averages.items()
+                    if data["count"] > 0]
+        warmest_stations = [station for station, avg in averages if avg >= warmest_avg - tie_tolerance]
+        coolest_stations = [station for station, avg in averages if avg <= coolest_avg + tie_tolerance]
+
+    if details is not None:
+        for station, data in station_averages.items():
+            if data["count"] > 0:
+                temps = station_temp_ranges[station]
+                details[station] = {"count": data["count"], "average": data["sum"] / data["count"],
+                                    "min": temps["min"], "max": temps["max"]}
+
     # Return all computed results as a tuple
     return (seasonal_averages, stations_with_largest_range, largest_range,
             warmest_stations, warmest_avg, coolest_stations, coolest_avg)
 
+
+# Column index (0-11, January first) -> season index into SEASONS, used by the NumPy engine
+MONTH_SEASON_INDEX = [SEASONS.index(find_season(month)) for month in MONTHS]
+
+# Longest station name the fast CSV path handles; files with longer names use the general path
+MAX_NAME_LENGTH = 128
+
+# An empty cell: a comma followed by another comma, a line break or the end of the file
+EMPTY_CELL = re.compile(r',(?=,|\n|$)')
+
+
+def parse_csv_array(text, url):
+    # Parse one CSV file into (station names, stations x 12 float array with NaN for missing values)
+    names, values, _ = parse_csv_columns(text, url)
+    return names, values
+
+
+def parse_csv_columns(text, url, extra_columns=()):
+    # Like parse_csv_array, plus a dict of float arrays (NaN if missing) for the numeric extra_columns
+    # such as ('STN_ID', 'LAT', 'LON'); returns (names, values, extras)
+    if '\r' in text:
+        text = text.replace('\r\n', '\n')
+    header_line, _, body = text.partition('\n')
+    header = next(csv.reader([header_line]), None)
+    if not header or 'STATION_NAME' not in header:
+        print(f"Warning: 'STATION_NAME' column missing in {url}. Skipping.")
+        return [], np.empty((0, 12)), {column: np.empty(0) for column in extra_columns}
+    if not body.strip():  # Header only: nothing to parse (np.loadtxt would warn about empty input)
+        return [], np.empty((0, 12)), {column: np.empty(0) for column in extra_columns}
+    name_col = header.index('STATION_NAME')
+    present = [column for column in extra_columns if column in header]
+
+    # Fast path for plain files (names first, no quoting, all months present): np.loadtxt parses the rows in C
+    if name_col == 0 and '"' not in body and all(month in header for month in MONTHS):
+        month_cols = [header.index(month) for month in MONTHS]
+        filled = EMPTY_CELL.sub(',nan', body)  # Empty cells -> nan
+        row_type = np.dtype([('name', f'U{MAX_NAME_LENGTH}')] + [(column, np.float64) for column in present]
+                            + [('temps', np.float64, (12,))])
+        try:
+            rows = np.loadtxt(StringIO(filled), delimiter=',',
+                              usecols=[name_col] + [header.index(column) for column in present] + month_cols,
+                              dtype=row_type, ndmin=1, comments=None)
+            names = list(map(str.strip, rows['name'].tolist()))
+            if names and max(map(len, names)) >= MAX_NAME_LENGTH:
+                raise ValueError("station name may have been truncated")
+        except ValueError:
+            pass  # Short rows, non-numeric cells or very long names; use the general path below
+        else:
+            keep = slice(None)
+            if not all(names):
+                for _ in range(names.count("")):
+                    print(f"Warning: Empty station name in {url}. Skipping row.")
+                keep = np.asarray([bool(name) for name in names], dtype=bool)
+                names = [name for name in names if name]
+            extras = {column: rows[column][keep] if column in present else np.full(len(names), np.nan)
+                      for column in extra_columns}
+            return names, rows['temps'][keep].reshape(len(names), 12), extras
+
+    # General path: csv module for the rows, one conversion per cell
+    month_cols = [header.index(month) if month in header else None for month in MONTHS]
+    extra_cols = [header.index(column) if column in header else None for column in extra_columns]
+    names = []
+    cells = []  # Month cells of every kept row, flattened row by row
+    extra_cells = []  # Extra column cells of every kept row, flattened row by row
+    for row in csv.reader(StringIO(body)):
+        if not row:
+            continue  # Blank line (DictReader skips these too)
+        station = row[name_col].strip() if name_col < len(row) else ""
+        if not station:
+            print(f"Warning: Empty station name in {url}. Skipping row.")
+            continue
+        names.append(station)
+        cells.extend(row[col] if col is not None and col < len(row) else "" for col in month_cols)
+        extra_cells.extend(row[col] if col is not None and col < len(row) else "" for col in extra_cols)
+    values = np.array([to_float_or_nan(cell) for cell in cells], dtype=np.float64).reshape(len(names), 12)
+    extra_values = np.array([to_float_or_nan(cell) for cell in extra_cells], dtype=np.float64)
+    extra_values = extra_values.reshape(len(names), len(extra_columns))
+    return names, values, {column: extra_values[:, k] for k, column in enumerate(extra_columns)}
+
+
+def to_float_or_nan(cell):
+    try:
+        return float(cell)
+    except ValueError:  # Missing ("") or invalid cell
+        return float('nan')
+
+
+def summarise_arrays(parsed, tie_tolerance=0.0, details=None):
+    # Compute the results tuple from a list of (names, values) pairs, one per file, using array reductions
+    station_ids = {}  # Station name -> index, in first-seen order like the Python engine's dicts
+    row_ids = []
+    last_names, last_ids = None, None
+    for names, _ in parsed:
+        if names != last_names:  # Yearly files usually list the same stations in the same order
+            last_names, last_ids = names, [station_ids.setdefault(name, len(station_ids)) for name in names]
+        row_ids.extend(last_ids)
+    values = np.concatenate([v for _, v in parsed]) if parsed else np.empty((0, 12))
+    return summarise_columns(np.asarray(row_ids, dtype=np.intp), list(station_ids), values, tie_tolerance, details)
+
+
+def summarise_columns(row_ids, stations, values, tie_tolerance=0.0, details=None):
+    # Compute the results tuple from column arrays: row_ids[i] indexes stations (names in first-seen order)
+    # and values[i] holds that row's 12 monthly temperatures (NaN if missing)
+    n_stations = len(stations)
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0).ravel()  # Adding 0.0 for a missing cell leaves a sum unchanged
+    row_ids = np.asarray(row_ids, dtype=np.intp)  # bincount needs native-size indices
+    # bincount adds weights one cell at a time in file/row/month order, exactly like the Python engine
+    cell_station = np.repeat(row_ids, 12)
+    cell_season = np.tile(np.asarray(MONTH_SEASON_INDEX, dtype=np.intp), len(row_ids))
+
+    # Seasonal averages
+    season_sums = np.bincount(cell_season, weights=filled, minlength=len(SEASONS))
+    season_counts = np.bincount(MONTH_SEASON_INDEX, weights=valid.sum(axis=0), minlength=len(SEASONS))
+    seasonal_averages = {season: float(season_sums[k] / season_counts[k]) if season_counts[k] > 0 else None
+                         for k, season in enumerate(SEASONS)}
+
+    # Per-station sum/count/min/max (fmin/fmax skip NaN, so all-missing rows leave min/max at +/-inf)
+    sums = np.bincount(cell_station, weights=filled, minlength=n_stations)
+    counts = np.bincount(row_ids, weights=valid.sum(axis=1), minlength=n_stations)
+    mins = np.full(n_stations, np.inf)
+    maxs = np.full(n_stations, -np.inf)
+    np.fmin.at(mins, row_ids, np.fmin.reduce(values, axis=1, initial=np.inf))
+    np.fmax.at(maxs, row_ids, np.fmax.reduce(values, axis=1, initial=-np.inf))
+    has_data = counts > 0
+
+    # Largest range; like the Python engine, the search starts from 0 so all-zero ranges tie at 0
+    ranges = maxs[has_data] - mins[has_data]
+    data_ids = np.flatnonzero(has_data)
+    largest_range = float(ranges.max()) if ranges.size else 0
+    if not largest_range > 0:
+        largest_range = 0
+    stations_with_largest_range = [stations[k] for k in data_ids[ranges >= largest_range - tie_tolerance]]
+
+    # Warmest and coolest averages
+    averages = sums[has_data] / counts[has_data]
+    if averages.size:
+        warmest_avg = float(averages.max())
+        coolest_avg = float(averages.min())
+        warmest_stations = [stations[k] for k in data_ids[averages >= warmest_avg - tie_tolerance]]
+        coolest_stations = [stations[k] for k in data_ids[averages <= coolest_avg + tie_tolerance]]
+    else:
+        warmest_avg, coolest_avg = float('-inf'), float('inf')
+        warmest_stations, coolest_stations = [], []
+
+    if details is not None:  # Per-station table (see summarise_aggregates)
+        for k, count, average, low, high in zip(data_ids.tolist(), counts[has_data].tolist(), averages.tolist(),
+                                                mins[has_data].tolist(), maxs[has_data].tolist()):
+            details[stations[k]] = {"count": int(count), "average": average, "min": low, "max": high}
+
+    return (seasonal_averages, stations_with_largest_range, largest_range,
+            warmest_stations, warmest_avg, coolest_stations, coolest_avg)
+
+
+class Accumulator:
+    """Count, exact sum and sum of squares, min and max of a stream of floats; mergeable.
+
+    The sums are held as Shewchuk's non-overlapping partials (the method behind ``math.fsum``), and
+    each square is added as the exact pair from ``square_exact``. ``sum()``, ``average()`` and
+    ``variance()`` are therefore correctly rounded whatever order the values, files or worker
+    results arrive in.
+    """
+
+    __slots__ = ("count", "partials", "square_partials", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.partials = []  # Non-overlapping floats whose exact sum is the sum of every value added
+        self.square_partials = []  # The same for the sum of the squares
+        self.min = float('inf')
+        self.max = float('-inf')
+
+    def add_exact(self, x, partials=None):
+        # Add x to the partials (or to another partials list) without rounding (Shewchuk's grow-expansion)
+        if partials is None:
+            partials = self.partials
+        i = 0
+        for y in partials:
+            if abs(x) < abs(y):
+                x, y = y, x
+            high = x + y
+            low = y - (high - x)
+            if low:
+                partials[i] = low
+                i += 1
+            x = high
+        partials[i:] = [x]
+
+    def add(self, value):
+        self.add_exact(value)
+        for part in square_exact(value):
+            self.add_exact(part, self.square_partials)
+        self.count += 1
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        if not other.count:
+            return
+        for partial in other.partials:
+            self.add_exact(partial)
+        for partial in other.square_partials:
+            self.add_exact(partial, self.square_partials)
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def sum(self):
+        return math.fsum(self.partials)
+
+    def average(self):
+        return self.sum() / self.count if self.count else None
+
+    def variance(self, ddof=0):
+        # (sum of squares - sum ** 2 / count) / (count - ddof), evaluated exactly and rounded once
+        if self.count <= ddof:
+            return None
+        total = sum(map(Fraction, self.partials), Fraction(0))
+        squares = sum(map(Fraction, self.square_partials), Fraction(0))
+        return float((squares - total * total / self.count) / (self.count - ddof))
+
+
+def square_exact(x):
+    # x * x as two floats whose sum is exact: the rounded product and its error (Dekker's algorithm,
+    # splitting x into two 26-bit halves with Veltkamp's constant)
+    product = x * x
+    scaled = 134217729.0 * x  # 2 ** 27 + 1
+    high = scaled - (scaled - x)
+    low = x - high
+    return product, ((high * high - product) + 2 * high * low) + low * low
+
+
+def new_accumulators():
+    # engine="exact" aggregates: (season -> Accumulator, station -> Accumulator)
+    return {season: Accumulator() for season in SEASONS}, {}
+
+
+def fold_exact(file, url, seasons, stations, stats=None, quantiles=None):
+    # engine="exact": add every temperature in one CSV file to the season and station accumulators
+    # stats and quantiles as for fold_csv_file
+    for station, _, _, _, temps in parse_station_rows(file, url, stats):
+        accumulator = stations.get(station)
+        if accumulator is None:
+            accumulator = stations[station] = Accumulator()
+        for month, temp in enumerate(temps):
+            if temp is not None:
+                accumulator.add(temp)
+                seasons[SEASONS[MONTH_SEASON_INDEX[month]]].add(temp)
+        if quantiles is not None:
+            quantiles.add_temps(station, [float('nan') if temp is None else temp for temp in temps])
+
+
+def merge_accumulators(accumulators, partial):
+    # Merge another (seasons, stations) pair into accumulators
+    for table, other in zip(accumulators, partial):
+        for key, accumulator in other.items():
+            if key not in table:
+                table[key] = Accumulator()
+            table[key].merge(accumulator)
+
+
+def summarise_accumulators(seasons, stations, tie_tolerance=0.0, details=None):
+    # The results tuple from exact accumulators; tied stations are listed in name order, so the
+    # results are identical whatever order the files were read or merged in.
+    # details: as for summarise_aggregates, plus each station's "variance"
+    seasonal_averages = {season: seasons[season].average() for season in SEASONS}
+    with_data = sorted((station, accumulator) for station, accumulator in stations.items() if accumulator.count)
+
+    ranges = [(station, accumulator.max - accumulator.min) for station, accumulator in with_data]
+    largest_range = max((temp_range for _, temp_range in ranges), default=0)
+    if not largest_range > 0:
+        largest_range = 0  # Like the Python engine, the search starts from 0
+    stations_with_largest_range = [station for station, temp_range in ranges
+                                   if temp_range >= largest_range - tie_tolerance]
+
+    averages = [(station, accumulator.average()) for station, accumulator in with_data]
+    warmest_avg = max((avg for _, avg in averages), default=float('-inf'))
+    coolest_avg = min((avg for _, avg in averages), default=float('inf'))
+    warmest_stations = [station for station, avg in averages if avg >= warmest_avg - tie_tolerance]
+    coolest_stations = [station for station, avg in averages if avg <= coolest_avg + tie_tolerance]
+    if details is not None:
+        for station, accumulator in with_data:
+            details[station] = {"count": accumulator.count, "average": accumulator.average(), "min": accumulator.min,
+                                "max": accumulator.max, "variance": accumulator.variance()}
+    return (seasonal_averages, stations_with_largest_range, largest_range,
+            warmest_stations, warmest_avg, coolest_stations, coolest_avg)
+
+
+def pack_aggregates(seasonal_data, station_temp_ranges, station_averages):
+    # Compact partial aggregate for sending between processes: seasonal (sum, count) pairs in SEASONS order,
+    # then station names and parallel min/max/sum/count lists
+    names = list(station_averages)
+    return ([(seasonal_data[season]["sum"], seasonal_data[season]["count"]) for season in SEASONS],
+            names,
+            [station_temp_ranges[station]["min"] for station in names],
+            [station_temp_ranges[station]["max"] for station in names],
+            [station_averages[station]["sum"] for station in names],
+            [station_averages[station]["count"] for station in names])
+
+
+def merge_aggregates(aggregates, partial):
+    # Fold one packed partial aggregate into the running ones (associative, so any grouping gives the same totals)
+    seasonal_data, station_temp_ranges, station_averages = aggregates
+    seasonal, names, mins, maxs, sums, counts = partial
+    for season, (total, count) in zip(SEASONS, seasonal):
+        seasonal_data[season]["sum"] += total
+        seasonal_data[season]["count"] += count
+    for station, low, high, total, count in zip(names, mins, maxs, sums, counts):
+        temps = station_temp_ranges.get(station)
+        if temps is None:  # First time this station is seen
+            station_temp_ranges[station] = {"min": low, "max": high}
+            station_averages[station] = {"sum": total, "count": count}
+            continue
+        if low < temps["min"]:
+            temps["min"] = low
+        if high > temps["max"]:
+            temps["max"] = high
+        data = station_averages[station]
+        data["sum"] += total
+        data["count"] += count
+    return aggregates
+
+
+def array_partial(names, values):
+    # Reduce one parsed file (see parse_csv_array) to a packed partial aggregate
+    station_ids = {}
+    row_ids = np.asarray([station_ids.setdefault(name, len(station_ids)) for name in names], dtype=np.intp)
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+
+    season_sums = np.bincount(MONTH_SEASON_INDEX, weights=filled.sum(axis=0), minlength=len(SEASONS))
+    season_counts = np.bincount(MONTH_SEASON_INDEX, weights=valid.sum(axis=0), minlength=len(SEASONS))
+    seasonal = [(float(total), int(count)) for total, count in zip(season_sums, season_counts)]
+
+    n_stations = len(station_ids)
+    sums = np.bincount(row_ids, weights=filled.sum(axis=1), minlength=n_stations)
+    counts = np.bincount(row_ids, weights=valid.sum(axis=1), minlength=n_stations).astype(int)
+    mins = np.full(n_stations, np.inf)
+    maxs = np.full(n_stations, -np.inf)
+    np.fmin.at(mins, row_ids, np.fmin.reduce(values, axis=1, initial=np.inf))
+    np.fmax.at(maxs, row_ids, np.fmax.reduce(values, axis=1, initial=-np.inf))
+    return seasonal, list(station_ids), mins.tolist(), maxs.tolist(), sums.tolist(), counts.tolist()
+
+
+def reduce_file(source, content, engine):
+    # Worker process: reduce one file to (sha256 of its bytes, packed partial aggregate); content is None for
+    # local files, which are opened and streamed here
+    with open_source(source) if content is None else BytesIO(content) as f:
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+        f.seek(0)
+        if engine == "numpy":
+            return digest.hexdigest(), array_partial(*parse_csv_array(f.read().decode('utf-8'), source))
+        if engine == "exact":
+            accumulators = new_accumulators()
+            fold_exact(TextIOWrapper(f, encoding='utf-8', newline=''), source, *accumulators)
+            return digest.hexdigest(), accumulators
+        aggregates = new_aggregates()
+        fold_csv_file(TextIOWrapper(f, encoding='utf-8', newline=''), source, *aggregates)
+        return digest.hexdigest(), pack_aggregates(*aggregates)
+
+
+def run_inline(fn, *args):
+    # Stand-in for executor.submit when no process pool is used
+    future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def file_signature(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def reduce_to_partials(file_urls, engine, processes=None, manifest=None, **fetch_options):
+    # Map each file to a packed partial aggregate, in a process pool when processes > 1, and return
+    # [(url, status, manifest entry, partial)] in file order. status is "new", "changed", "unchanged" or
+    # "failed". Files that match their manifest entry (same size and mtime, or same hash) are not parsed.
+    manifest = manifest or {}
+    remote = [url for url in file_urls if is_url(url)]
+    fetched = fetch_files(remote, **fetch_options)  # Downloads still happen in threads in this process
+    executor = ProcessPoolExecutor(max_workers=processes) if processes and processes > 1 else None
+    submit = executor.submit if executor else run_inline
+    results = []
+    try:
+        jobs = []  # (url, fetch error, signature, future)
+        for url in file_urls:
+            entry = manifest.get(url)
+            if is_url(url):
+                _, content, error = next(fetched)  # Blocks until this download is done; earlier jobs keep running
+                if error is None and entry is not None and hashlib.sha256(content).hexdigest() == entry["sha256"]:
+                    jobs.append((url, None, {}, None))  # Same bytes as last time
+                else:
+                    jobs.append((url, error, {}, None if error else submit(reduce_file, url, content, engine)))
+                continue
+            try:
+                signature = file_signature(url) if entry is not None else {}
+            except OSError as e:
+                jobs.append((url, urllib.error.URLError(e), {}, None))
+                continue
+            if signature and all(entry.get(key) == value for key, value in signature.items()):
+                jobs.append((url, None, signature, None))  # Unchanged on disk: not even read
+            else:
+                jobs.append((url, None, signature, submit(reduce_file, url, None, engine)))
+
+        total_files = len(file_urls)  # Total number of files for progress tracking
+        for i, (url, error, signature, job) in enumerate(jobs, 1):
+            entry = manifest.get(url)
+            if error is None and job is None:
+                results.append((url, "unchanged", {**entry, **signature}, None))
+                continue
+            print(f"Processing file {i}/{total_files}: {url}")  # Show progress
+            try:
+                if error is not None:
+                    raise error  # Report the fetch failure below
+                digest, partial = job.result()
+            except urllib.error.URLError as e:
+                print(f"Failed to fetch {url}: {e}")  # Handle URL fetch errors
+                results.append((url, "failed", None, None))
+                continue
+            if not is_url(url) and not signature:
+                signature = file_signature(url)
+            new_entry = {"sha256": digest, **signature}
+            if entry is None:
+                results.append((url, "new", new_entry, partial))
+            elif entry["sha256"] == digest:  # Touched but not changed
+                results.append((url, "unchanged", new_entry, None))
+            else:
+                results.append((url, "changed", new_entry, partial))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    for _ in fetched:
+        pass  # Let the fetch generator finish so the download cache index is saved
+    return results
+
+
+# Version of the incremental state file layout; state files with another version are rebuilt from scratch
+STATE_VERSION = 1
+
+
+def empty_state():
+    return {"version": STATE_VERSION, "aggregates": pack_aggregates(*new_aggregates()), "files": {}}
+
+
+def load_state(state_file):
+    # Read the incremental state file: running aggregates (packed, see pack_aggregates) plus a manifest
+    # mapping each file already folded in to its sha256 (and size/mtime for local files)
+    try:
+        with open(state_file, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return empty_state()
+    except ValueError:
+        print(f"Warning: state file {state_file} is corrupt. Reprocessing all files.")
+        return empty_state()
+    if state.get("version") != STATE_VERSION:
+        print(f"Warning: state file {state_file} has version {state.get('version')}. Reprocessing all files.")
+        return empty_state()
+    return state
+
+
+def save_state(state_file, state):
+    os.makedirs(os.path.dirname(os.path.abspath(state_file)), exist_ok=True)
+    atomic_write_bytes(state_file, json.dumps(state, separators=(",", ":")).encode("utf-8"))
+
+
+def update_state(state, file_urls, engine, processes=None, **fetch_options):
+    # Fold only new files into the running aggregates in state. A changed or removed file cannot be taken
+    # back out of a min/max, so in that case the aggregates are rebuilt from all files.
+    manifest = state["files"]
+    removed = set(manifest) - set(file_urls)
+    results = [] if removed else reduce_to_partials(file_urls, engine, processes, manifest, **fetch_options)
+    if removed or any(status == "changed" for _, status, _, _ in results):
+        print("Source files changed since the state file was written. Rebuilding aggregates.")
+        state.update(empty_state())
+        manifest = state["files"]
+        results = reduce_to_partials(file_urls, engine, processes, **fetch_options)
+
+    reused = sum(status == "unchanged" for _, status, _, _ in results)
+    if reused:
+        print(f"Reusing {reused} unchanged file(s) from the state file.")
+    aggregates = new_aggregates()
+    merge_aggregates(aggregates, state["aggregates"])
+    for url, status, entry, partial in results:
+        if status == "new":
+            merge_aggregates(aggregates, partial)
+        if entry is not None:
+            manifest[url] = entry
+    state["aggregates"] = pack_aggregates(*aggregates)
+    return aggregates
+
+
+# Version of the column store layout; stores with another version are rebuilt
+COLUMN_STORE_VERSION = 1
+
+# Numeric CSV columns copied into the column store next to the station names and monthly temperatures
+STORE_EXTRA_COLUMNS = ('STN_ID', 'LAT', 'LON')
+
+# The year in a file name such as stations_group_1986.csv (the last run of four digits)
+YEAR_IN_NAME = re.compile(r'(\d{4})\D*$')
+
+
+def source_signature(source, cache=None):
+    # What identifies one version of a source: size and mtime for local files, the content hash for URLs
+    # (taken from the download cache index when possible, so a warm check does no network I/O)
+    if not is_url(source):
+        return file_signature(source)
+    entry = cache.lookup(source) if cache is not None else None
+    if entry is not None:
+        return {"sha256": entry["sha256"]}
+    return {"sha256": hashlib.sha256(load_source(source, cache)).hexdigest()}
+
+
+def open_column_store(store_dir, file_urls, cache=None):
+    # Memory-map a column store built from exactly these sources; returns None if it is missing or stale
+    try:
+        with open(os.path.join(store_dir, "manifest.json"), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if manifest.get("version") != COLUMN_STORE_VERSION or [s for s, _ in manifest["sources"]] != file_urls:
+        return None
+    for source, signature in manifest["sources"]:
+        try:
+            if signature is None or source_signature(source, cache) != signature:
+                return None  # A source changed (or failed last time) since the store was built
+        except (OSError, urllib.error.URLError):
+            return None
+    return map_column_store(store_dir)
+
+
+def map_column_store(store_dir):
+    # Memory-map every column of a store; nothing is read until the arrays are used
+    return {name: np.load(os.path.join(store_dir, f"{name}.npy"), mmap_mode='r')
+            for name in ("station", "stations", "stn_id", "year", "lat", "lon", "temps")}
+
+
+def build_column_store(store_dir, file_urls, **fetch_options):
+    # Parse every source once and write one .npy file per column, plus manifest.json recording the
+    # signature of each source; the new store replaces any old one only once it is complete
+    cache = fetch_options.get("cache")
+    station_ids = {}  # Station name -> index, in first-seen order like the Python engine's dicts
+    columns = {"station": [], "stn_id": [], "year": [], "lat": [], "lon": [], "temps": []}
+    sources = []
+    total_files = len(file_urls)  # Total number of files for progress tracking
+    for i, (url, stream, error) in enumerate(fetch_files(file_urls, stream=True, **fetch_options), 1):
+        print(f"Processing file {i}/{total_files}: {url}")  # Show progress
+        if error is not None:
+            print(f"Failed to fetch {url}: {error}")  # Handle URL fetch errors
+            sources.append((url, None))  # Never matches, so the next run tries this file again
+            continue
+        with stream:
+            names, values, extras = parse_csv_columns(stream.read().decode('utf-8'), url, STORE_EXTRA_COLUMNS)
+        sources.append((url, source_signature(url, cache)))
+        match = YEAR_IN_NAME.search(os.path.basename(urllib.parse.urlsplit(url).path))
+        columns["station"].append(np.asarray([station_ids.setdefault(name, len(station_ids)) for name in names],
+                                             dtype=np.int32))
+        columns["stn_id"].append(np.where(np.isnan(extras['STN_ID']), -1, extras['STN_ID']).astype(np.int64))
+        columns["year"].append(np.full(len(names), int(match.group(1)) if match else -1, dtype=np.int32))
+        columns["lat"].append(extras['LAT'])
+        columns["lon"].append(extras['LON'])
+        columns["temps"].append(values)
+
+    parent = os.path.dirname(os.path.abspath(store_dir))
+    os.makedirs(parent, exist_ok=True)
+    build_dir = tempfile.mkdtemp(dir=parent, prefix=".tmp-store-")
+    try:
+        empty = {"station": np.empty(0, np.int32), "stn_id": np.empty(0, np.int64), "year": np.empty(0, np.int32),
+                 "lat": np.empty(0), "lon": np.empty(0), "temps": np.empty((0, 12))}
+        for name, parts in columns.items():
+            np.save(os.path.join(build_dir, f"{name}.npy"), np.concatenate(parts) if parts else empty[name])
+        np.save(os.path.join(build_dir, "stations.npy"), np.asarray(list(station_ids), dtype=str))
+        with open(os.path.join(build_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump({"version": COLUMN_STORE_VERSION, "sources": sources}, f)
+        old_dir = None
+        if os.path.exists(store_dir):
+            old_dir = tempfile.mkdtemp(dir=parent, prefix=".old-store-")
+            os.replace(store_dir, os.path.join(old_dir, "store"))
+        os.replace(build_dir, store_dir)
+        if old_dir is not None:
+            shutil.rmtree(old_dir)
+    except BaseException:
+        shutil.rmtree(build_dir, ignore_errors=True)
+        raise
+    return map_column_store(store_dir)
+
+
+def load_column_store(store_dir, file_urls, **fetch_options):
+    # Open the column store if it matches the sources, otherwise (re)build it from the CSV files
+    store = open_column_store(store_dir, file_urls, fetch_options.get("cache"))
+    if store is not None:
+        print(f"Using column store {store_dir} ({len(store['station'])} rows, {len(file_urls)} files)")
+        return store
+    return build_column_store(store_dir, file_urls, **fetch_options)
+
+
+def summarise_store(store, tie_tolerance=0.0, details=None):
+    # Seasonal, range and extremes results straight from the memory-mapped columns
+    return summarise_columns(store["station"], store["stations"].tolist(), store["temps"], tie_tolerance, details)
+
+
+class ExactQuantiles:
+    """Every value kept in a compact float array; sorted when a quantile is asked for."""
+
+    __slots__ = ("values", "sorted")
+
+    def __init__(self):
+        self.values = array.array('d')
+        self.sorted = True
+
+    def add(self, value):
+        self.values.append(value)
+        self.sorted = False
+
+    def extend(self, values):
+        self.values.extend(values)
+        self.sorted = False
+
+    def merge(self, other):
+        self.values.extend(other.values)
+        self.sorted = False
+
+    def count(self):
+        return len(self.values)
+
+    def nbytes(self):
+        return self.values.itemsize * len(self.values)
+
+    def quantile(self, q):
+        # Linear interpolation between the closest ranks (numpy.quantile's default method)
+        if not self.values:
+            return None
+        if not self.sorted:
+            self.values = array.array('d', sorted(self.values))
+            self.sorted = True
+        position = q * (len(self.values) - 1)
+        low = int(position)
+        high = min(low + 1, len(self.values) - 1)
+        return self.values[low] + (self.values[high] - self.values[low]) * (position - low)
+
+
+class KLLSketch:
+    """Mergeable KLL quantile sketch: memory grows with log(n) rather than n.
+
+    Level h holds values that each stand for 2**h inputs. When the sketch is full, the lowest full level
+    is sorted and every other value is promoted to the level above. The promoted half alternates per
+    level instead of being random, so the same input in the same order always gives the same sketch.
+    Rank error is roughly 1.7 / k.
+    """
+
+    __slots__ = ("k", "levels", "flips", "capacities", "size", "limit", "n")
+
+    def __init__(self, k=200):
+        self.k = k
+        self.levels = [array.array('d')]
+        self.flips = [0]  # Which half each level promotes next
+        self.capacities = [k]  # Per level; lower levels get smaller as levels are added
+        self.size = 0  # Values held across all levels
+        self.limit = k  # Total capacity of all levels
+        self.n = 0  # Values added
+
+    def add_level(self):
+        self.levels.append(array.array('d'))
+        self.flips.append(0)
+        depth = len(self.levels)
+        self.capacities = [max(8, math.ceil(self.k * (2 / 3) ** (depth - level - 1))) for level in range(depth)]
+        self.limit = sum(self.capacities)
+
+    def add(self, value):
+        self.levels[0].append(value)
+        self.size += 1
+        self.n += 1
+        if self.size >= self.limit:
+            self.compress()
+
+    def extend(self, values):
+        self.levels[0].extend(values)
+        self.size += len(values)
+        self.n += len(values)
+        while self.size >= self.limit:
+            self.compress()
+
+    def compress(self):
+        # Halve the lowest level that is over its capacity
+        for level, values in enumerate(self.levels):
+            if len(values) >= self.capacities[level]:
+                if level + 1 == len(self.levels):
+                    self.add_level()
+                promoted = sorted(values)[self.flips[level]::2]
+                self.levels[level + 1].extend(promoted)
+                self.flips[level] ^= 1
+                self.levels[level] = array.array('d')
+                self.size -= len(values) - len(promoted)
+                return
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.add_level()
+        for level, values in enumerate(other.levels):
+            self.levels[level].extend(values)
+        self.n += other.n
+        self.size = sum(map(len, self.levels))
+        while self.size >= self.limit:
+            self.compress()
+
+    def count(self):
+        return self.n
+
+    def nbytes(self):
+        return sum(values.itemsize * len(values) for values in self.levels)
+
+    def quantile(self, q):
+        # The held value at weighted rank q * n
+        if not self.n:
+            return None
+        weighted = sorted((value, 1 << level) for level, values in enumerate(self.levels) for value in values)
+        target = q * sum(weight for _, weight in weighted)
+        seen = 0
+        for value, weight in weighted:
+            seen += weight
+            if seen >= target:
+                return value
+        return weighted[-1][0]
+
+
+class QuantileStats:
+    """Optional per-station and per-season quantiles for process_temperature_data (pass as ``quantiles=``).
+
+    ``mode="exact"`` keeps every monthly temperature (ExactQuantiles); ``mode="sketch"`` keeps a KLLSketch
+    of size ``k`` per station and season, whose memory stays bounded however many years are added. Both
+    merge, so per-file results can be combined. Read the results with ``quantiles(qs)``.
+    """
+
+    def __init__(self, mode="exact", k=200):
+        if mode not in ("exact", "sketch"):
+            raise ValueError(f"unknown quantile mode '{mode}'")
+        self.mode = mode
+        self.k = k
+        self.stations = {}  # Station name -> store
+        self.seasons = {}  # Season -> store
+
+    def new_store(self):
+        return ExactQuantiles() if self.mode == "exact" else KLLSketch(self.k)
+
+    def store(self, table, key):
+        store = table.get(key)
+        if store is None:
+            store = table[key] = self.new_store()
+        return store
+
+    def add_row(self, station, cells):
+        # cells: the row's 12 raw month cells in MONTHS order ("" if absent); invalid cells are skipped
+        self.add_temps(station, [to_float_or_nan(cell) for cell in cells])
+
+    def add_array(self, names, values):
+        # names and a rows x 12 array (NaN for missing), as returned by parse_csv_array
+        for station, temps in zip(names, values.tolist()):
+            self.add_temps(station, temps)
+
+    def add_temps(self, station, temps):
+        # One row's 12 temperatures in MONTHS order, NaN if missing; stores take them in batches
+        by_season = [[], [], [], []]  # In SEASONS order
+        for month, temp in enumerate(temps):
+            if temp == temp:  # Not NaN
+                by_season[MONTH_SEASON_INDEX[month]].append(temp)
+        present = [temp for temp in temps if temp == temp]
+        if present or station not in self.stations:
+            self.store(self.stations, station).extend(present)
+        for season, season_temps in zip(SEASONS, by_season):
+            if season_temps:
+                self.store(self.seasons, season).extend(season_temps)
+
+    def merge(self, other):
+        for table, other_table in ((self.stations, other.stations), (self.seasons, other.seasons)):
+            for key, store in other_table.items():
+                self.store(table, key).merge(store)
+
+    def nbytes(self):
+        return sum(store.nbytes() for table in (self.stations, self.seasons) for store in table.values())
+
+    def quantiles(self, qs=(0.5, 0.95)):
+        # {"stations": {station: {q: value}}, "seasons": {season: {q: value}}}
+        return {"stations": {station: {q: store.quantile(q) for q in qs} for station, store in self.stations.items()},
+                "seasons": {season: {q: self.seasons[season].quantile(q) for q in qs}
+                            for season in SEASONS if season in self.seasons}}
+
+
+class RunMetrics:
+    """Optional instrumentation for process_temperature_data (pass an instance as ``metrics=``).
+
+    Collects one record per file (seconds waiting for the fetch and parsing, bytes, rows, cells and
+    skipped rows/cells by reason) and the seconds spent in each stage. If ``stream`` is given, every
+    file record is written to it as a JSON line as soon as that file is done. Afterwards render
+    everything with ``json_lines()`` or ``prometheus()``, or save it with ``write(path, format)``.
+
+    Row-level skip reasons are only known to the Python engine; the NumPy engine reports missing and
+    invalid cells together. The state file, process pool and column store modes record stages only.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream
+        self.files = []  # One record per file, in processing order
+        self.stages = {}  # Stage name -> seconds
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    @staticmethod
+    def new_file(url):
+        return {"url": url, "status": "ok", "bytes": 0, "rows": 0, "cells": 0, "skipped_rows": {},
+                "skipped_cells": {}, "fetch_seconds": 0.0, "parse_seconds": 0.0}
+
+    def add_file(self, record):
+        self.files.append(record)
+        if self.stream is not None:
+            self.stream.write(json.dumps({"event": "file", **record}) + "\n")
+            self.stream.flush()
+
+    def totals(self):
+        # Run-wide sums over the file records
+        totals = {"files": {}, "bytes": 0, "rows": 0, "cells": 0, "skipped_rows": {}, "skipped_cells": {}}
+        for record in self.files:
+            add_counts(totals["files"], **{record["status"]: 1})
+            for key in ("bytes", "rows", "cells"):
+                totals[key] += record[key]
+            add_counts(totals["skipped_rows"], **record["skipped_rows"])
+            add_counts(totals["skipped_cells"], **record["skipped_cells"])
+        return totals
+
+    def json_lines(self):
+        lines = [json.dumps({"event": "file", **record}) for record in self.files]
+        lines.append(json.dumps({"event": "run", "stages": self.stages, **self.totals()}))
+        return "\n".join(lines) + "\n"
+
+    def prometheus(self):
+        # Prometheus text exposition format
+        def label(value):
+            return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        totals = self.totals()
+        lines = ["# TYPE temperature_stage_seconds gauge"]
+        lines += [f'temperature_stage_seconds{{stage="{label(stage)}"}} {seconds:.6f}'
+                  for stage, seconds in self.stages.items()]
+        lines.append("# TYPE temperature_files_total counter")
+        lines += [f'temperature_files_total{{status="{label(status)}"}} {count}'
+                  for status, count in totals["files"].items()]
+        for key in ("bytes", "rows", "cells"):
+            lines += [f"# TYPE temperature_{key}_total counter", f"temperature_{key}_total {totals[key]}"]
+        for key in ("skipped_rows", "skipped_cells"):
+            lines.append(f"# TYPE temperature_{key}_total counter")
+            lines += [f'temperature_{key}_total{{reason="{label(reason)}"}} {count}'
+                      for reason, count in totals[key].items()]
+        lines.append("# TYPE temperature_file_seconds gauge")
+        for record in self.files:
+            for stage in ("fetch", "parse"):
+                lines.append(f'temperature_file_seconds{{url="{label(record["url"])}",stage="{stage}"}} '
+                             f'{record[stage + "_seconds"]:.6f}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path, format="jsonl"):
+        # format: "jsonl" or "prometheus"
+        text = self.prometheus() if format == "prometheus" else self.json_lines()
+        atomic_write_bytes(path, text.encode("utf-8"))
+
+
+def process_temperature_data(file_urls, max_workers=8, timeout=30, retries=3,
+                             cache_dir=DEFAULT_CACHE_DIR, cache_max_bytes=512 * 1024 * 1024, revalidate=False,
+                             engine="python", processes=None, state_file=None, column_store=None, metrics=None,
+                             quantiles=None, tie_tolerance=0.0, details=None):
+    # engine="numpy" parses each file into an array and aggregates with array reductions (same results, faster)
+    # engine="exact" uses Accumulator (exact sums), so results do not depend on file order or processes (slower)
+    # tie_tolerance: stations within this many degrees of an extreme are reported as tied
+    # details={} is filled with per-station count/average/min/max (see summarise_aggregates), e.g. for write_results
+    # processes=N reduces files to partial aggregates in N worker processes and merges them; totals are
+    # then added per file rather than per cell, so averages can differ from the serial run in the last bits
+    # state_file=path saves the running aggregates and a manifest of file hashes, so later runs only parse new files
+    # column_store=dir keeps the parsed archive as memory-mapped .npy columns (rebuilt when a source changes),
+    # so later runs skip CSV parsing entirely; it implies the NumPy engine
+    # metrics=RunMetrics() records per-file and per-stage timings, byte/row/cell counts and skip reasons
+    # quantiles=QuantileStats() collects per-station and per-season quantiles (serial run only)
+    if column_store:
+        engine = "numpy"
+    if engine == "numpy" and np is None:
+        raise ImportError("engine='numpy' requires NumPy (pip install numpy)")
+    if engine not in ("python", "numpy", "exact"):
+        raise ValueError(f"unknown engine '{engine}'")
+    if engine == "exact" and state_file:
+        raise ValueError("engine='exact' cannot be combined with state_file")
+    if quantiles is not None and (column_store or state_file or (processes and processes > 1)):
+        raise ValueError("quantiles are only collected by the serial run (no column_store, state_file or processes)")
+
+    file_urls = resolve_sources(file_urls)  # Local paths, directories, globs and URLs can be mixed
+    cache = open_cache(file_urls, cache_dir, cache_max_bytes)
+    fetch_options = dict(max_workers=max_workers, timeout=timeout, retries=retries, cache=cache, revalidate=revalidate)
+
+    stage = metrics.stage if metrics is not None else lambda name: contextlib.nullcontext()
+
+    if column_store:
+        with stage("load_store"):
+            store = load_column_store(column_store, file_urls, **fetch_options)
+        with stage("aggregate"):
+            return summarise_store(store, tie_tolerance, details)
+    if state_file:
+        with stage("update_state"):
+            state = load_state(state_file)
+            aggregates = update_state(state, file_urls, engine, processes, **fetch_options)
+            save_state(state_file, state)
+        with stage("aggregate"):
+            return summarise_aggregates(*aggregates, tie_tolerance, details)
+    if processes and processes > 1:
+        exact = engine == "exact"
+        aggregates = new_accumulators() if exact else new_aggregates()
+        with stage("reduce"):
+            for _, status, _, partial in reduce_to_partials(file_urls, engine, processes, **fetch_options):
+                if status != "failed":
+                    (merge_accumulators if exact else merge_aggregates)(aggregates, partial)
+        with stage("aggregate"):
+            return (summarise_accumulators if exact else summarise_aggregates)(*aggregates, tie_tolerance, details)
+
+    seasonal_data, station_temp_ranges, station_averages = new_aggregates()
+    parsed = []  # (names, values) per file for the NumPy engine
+    accumulators = new_accumulators()  # For the exact engine
+
+    total_files = len(file_urls)  # Total number of files for progress tracking
+    fetched = fetch_files(file_urls, stream=True, **fetch_options)
+    waiting_since = time.perf_counter()
+    for i, (url, stream, error) in enumerate(fetched, 1):  # Loop through each fetched file with index starting at 1
+        print(f"Processing file {i}/{total_files}: {url}")  # Show progress
+        record = RunMetrics.new_file(url) if metrics is not None else None
+        started = time.perf_counter()
+        try:
+            if error is not None:
+                raise error  # Report the fetch failure below
+            with stream:
+                if engine == "numpy":
+                    content = stream.read()
+                    names, values = parse_csv_array(content.decode('utf-8'), url)
+                    parsed.append((names, values))
+                    if quantiles is not None:
+                        quantiles.add_array(names, values)
+                    if record is not None:
+                        cells = int(np.count_nonzero(~np.isnan(values)))
+                        record.update(bytes=len(content), rows=len(names), cells=cells)
+                        add_counts(record["skipped_cells"], missing_or_invalid=values.size - cells)
+                elif engine == "exact":
+                    # Keep the wrapper bound: once it is garbage collected it closes stream, and tell() would fail
+                    file = TextIOWrapper(stream, encoding='utf-8', newline='')
+                    fold_exact(file, url, *accumulators, record, quantiles)
+                    if record is not None:
+                        record["bytes"] = stream.tell()
+                else:
+                    # Decode and parse row by row straight from the file, so memory does not grow with file size
+                    file = TextIOWrapper(stream, encoding='utf-8', newline='')
+                    fold_csv_file(file, url, seasonal_data, station_temp_ranges, station_averages, record, quantiles)
+                    if record is not None:
+                        record["bytes"] = stream.tell()
+
+        except urllib.error.URLError as e:
+            print(f"Failed to fetch {url}: {e}")  # Handle URL fetch errors
+            if record is not None:
+                record.update(status="fetch_failed", error=str(e))
+            continue  # Skip to next file
+        finally:
+            if record is not None:
+                finished = time.perf_counter()
+                record.update(fetch_seconds=started - waiting_since, parse_seconds=finished - started)
+                metrics.stages["fetch"] = metrics.stages.get("fetch", 0.0) + record["fetch_seconds"]
+                metrics.stages["parse"] = metrics.stages.get("parse", 0.0) + record["parse_seconds"]
+                metrics.add_file(record)
+            waiting_since = time.perf_counter()
+
+    with stage("aggregate"):
+        if engine == "numpy":
+            return summarise_arrays(parsed, tie_tolerance, details)
+        if engine == "exact":
+            return summarise_accumulators(*accumulators, tie_tolerance, details)
+        return summarise_aggregates(seasonal_data, station_temp_ranges, station_averages, tie_tolerance, details)
+
+
+async def process_temperature_data_async(file_urls, max_workers=8, timeout=30, retries=3,
+                                         cache_dir=DEFAULT_CACHE_DIR, cache_max_bytes=512 * 1024 * 1024,
+                                         revalidate=False, engine="python"):
+    # Async version of process_temperature_data for callers running an event loop; returns the same tuple.
+    # Downloads and parsing run in worker threads so the loop never blocks. At most max_workers downloads are
+    # in flight, and a new one only starts once an earlier file is taken for parsing (backpressure), so at most
+    # max_workers + 1 files are held at a time. Files are folded in input order, so results match the serial run.
+    if engine == "numpy" and np is None:
+        raise ImportError("engine='numpy' requires NumPy (pip install numpy)")
+    if engine not in ("python", "numpy", "exact"):
+        raise ValueError(f"unknown engine '{engine}'")
+
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers) + 1)  # One extra thread for parsing
+
+    def fetch(source):
+        try:
+            return source, open_source(source, cache, timeout, retries, revalidate), None
+        except urllib.error.URLError as e:
+            return source, None, e
+
+    def parse(stream, url):
+        with stream:
+            if engine == "numpy":
+                parsed.append(parse_csv_array(stream.read().decode('utf-8'), url))
+            elif engine == "exact":
+                fold_exact(TextIOWrapper(stream, encoding='utf-8', newline=''), url, *accumulators)
+            else:
+                fold_csv_file(TextIOWrapper(stream, encoding='utf-8', newline=''), url, *aggregates)
+
+    aggregates = new_aggregates()
+    accumulators = new_accumulators()  # For the exact engine
+    parsed = []  # (names, values) per file for the NumPy engine
+    pending = collections.deque()  # Download futures in input order
+    try:
+        file_urls = await loop.run_in_executor(executor, resolve_sources, file_urls)
+        cache = await loop.run_in_executor(executor, open_cache, file_urls, cache_dir, cache_max_bytes)
+        sources = iter(file_urls)
+        for source in itertools.islice(sources, max(1, max_workers)):
+            pending.append(loop.run_in_executor(executor, fetch, source))
+
+        total_files = len(file_urls)  # Total number of files for progress tracking
+        for i in range(1, total_files + 1):
+            url, stream, error = await pending.popleft()
+            for source in itertools.islice(sources, 1):  # Start the next download while this file is parsed
+                pending.append(loop.run_in_executor(executor, fetch, source))
+            print(f"Processing file {i}/{total_files}: {url}")  # Show progress
+            if error is not None:
+                print(f"Failed to fetch {url}: {error}")  # Handle URL fetch errors
+                continue
+            await loop.run_in_executor(executor, parse, stream, url)
+
+        if cache is not None:
+            await loop.run_in_executor(executor, cache.save)
+        if engine == "numpy":
+            return await loop.run_in_executor(executor, summarise_arrays, parsed)
+        if engine == "exact":
+            return await loop.run_in_executor(executor, summarise_accumulators, *accumulators)
+        return await loop.run_in_executor(executor, summarise_aggregates, *aggregates)
+    finally:
+        for future in pending:  # Only left over if cancelled or failed part way
+            if future.done() and not future.cancelled() and future.exception() is None and future.result()[1]:
+                future.result()[1].close()  # Downloaded but never parsed
+            future.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def read_station_rows(file_urls, **fetch_options):
+    # Yield (station name, STN_ID, year, lat, lon, [12 temps, None if missing]) for every row of every source
+    total_files = len(file_urls)  # Total number of files for progress tracking
+    for i, (url, stream, error) in enumerate(fetch_files(file_urls, stream=True, **fetch_options), 1):
+        print(f"Processing file {i}/{total_files}: {url}")  # Show progress
+        if error is not None:
+            print(f"Failed to fetch {url}: {error}")  # Handle URL fetch errors
+            continue
+        match = YEAR_IN_NAME.search(os.path.basename(urllib.parse.urlsplit(url).path))
+        year = int(match.group(1)) if match else None
+        with stream:
+            for station, stn_id, lat, lon, temps in parse_station_rows(
+                    TextIOWrapper(stream, encoding='utf-8', newline=''), url):
+                yield station, stn_id, year, lat, lon, temps
+
+
+def parse_station_rows(file, url, stats=None):
+    # Yield (station name, STN_ID, lat, lon, [12 temps in MONTHS order, None if missing]) for each row of a CSV file
+    # stats: optional dict (see RunMetrics.new_file) that receives the same counts as fold_csv_file gives it
+    reader = csv.reader(file)
+    header = next(reader, None)
+    if not header or 'STATION_NAME' not in header:
+        print(f"Warning: 'STATION_NAME' column missing in {url}. Skipping.")
+        if stats is not None:
+            stats["status"] = "no_station_column"
+        return
+    columns = {name: index for index, name in enumerate(header)}
+    name_col = columns['STATION_NAME']
+    id_col, lat_col, lon_col = columns.get('STN_ID'), columns.get('LAT'), columns.get('LON')
+    month_cols = [columns.get(month) for month in MONTHS]
+    rows = blank_rows = empty_names = missing = invalid = short = 0  # Counters for stats
+    for row in reader:
+        if not row:
+            blank_rows += 1
+            continue  # Skip blank lines
+        station = row[name_col].strip() if name_col < len(row) else ""
+        if not station:
+            print(f"Warning: Empty station name in {url}. Skipping row.")
+            empty_names += 1
+            continue
+        rows += 1
+        cell = lambda col: row[col].strip() if col is not None and col < len(row) else ""
+        temps = [to_float_or_none(cell(col)) for col in month_cols]
+        if stats is not None:
+            for col, temp in zip(month_cols, temps):
+                if temp is None and col is not None:
+                    if col >= len(row):
+                        short += 1
+                    elif row[col].strip():
+                        invalid += 1
+                    else:
+                        missing += 1
+        yield station, cell(id_col) or None, to_float_or_none(cell(lat_col)), to_float_or_none(cell(lon_col)), temps
+
+    if stats is not None:
+        present = sum(col is not None for col in month_cols)
+        stats["rows"] += rows
+        stats["cells"] += rows * present - (missing + invalid + short)
+        add_counts(stats["skipped_rows"], blank=blank_rows, empty_station_name=empty_names)
+        add_counts(stats["skipped_cells"], missing=missing, invalid=invalid, short_row=short,
+                   missing_month_column=rows * (len(MONTHS) - present))
+
+
+def to_float_or_none(cell):
+    try:
+        return float(cell)
+    except ValueError:  # Missing ("") or invalid cell
+        return None
+
+
+class StationIndex:
+    """In-memory index of the parsed archive for ad-hoc queries.
+
+    Rows are keyed by station (``STATION_NAME``, or its ``STN_ID``) and year. Each station keeps
+    its monthly series plus precomputed sum/count/min/max overall and per year, stations are
+    bucketed into a ``cell_degrees`` LAT/LON grid, and stations are pre-sorted by average so
+    top-k queries only slice a list. Build with ``from_sources`` or ``load``, then call
+    ``series``, ``bbox`` and ``top_k``.
+    """
+
+    def __init__(self, cell_degrees=1.0):
+        self.cell_degrees = cell_degrees
+        self.stations = {}  # name -> {"stn_id", "lat", "lon", "years": {year: [12 temps or None]}}
+        self.by_id = {}  # STN_ID -> name
+        self.grid = {}  # (lat cell, lon cell) -> [names]
+        self.totals = {}  # name -> {year or None (all years): [sum, count, min, max]}
+        self.ranked = {}  # year or None -> [(average, name)] sorted warmest first, built lazily
+
+    @classmethod
+    def from_sources(cls, file_urls, cell_degrees=1.0, cache_dir=DEFAULT_CACHE_DIR,
+                     cache_max_bytes=512 * 1024 * 1024, **fetch_options):
+        # Build the index from local paths, directories, globs and URLs (like process_temperature_data)
+        index = cls(cell_degrees)
+        file_urls = resolve_sources(file_urls)
+        cache = open_cache(file_urls, cache_dir, cache_max_bytes)
+        for row in read_station_rows(file_urls, cache=cache, **fetch_options):
+            index.add_row(*row)
+        index.finish()
+        return index
+
+    def add_row(self, station, stn_id, year, lat, lon, temps):
+        entry = self.stations.setdefault(station, {"stn_id": None, "lat": None, "lon": None, "years": {}})
+        if stn_id is not None:
+            entry["stn_id"] = stn_id
+        if lat is not None and lon is not None:  # The latest known position wins
+            entry["lat"], entry["lon"] = lat, lon
+        months = entry["years"].setdefault(year, [None] * 12)
+        for month, temp in enumerate(temps):
+            if temp is not None:
+                months[month] = temp
+
+    def finish(self):
+        # Build the lookup tables after the last add_row (or after loading)
+        self.by_id, self.grid, self.totals, self.ranked = {}, {}, {}, {}
+        for name, entry in self.stations.items():
+            if entry["stn_id"] is not None:
+                self.by_id[entry["stn_id"]] = name
+            if entry["lat"] is not None:
+                self.grid.setdefault(self.cell(entry["lat"], entry["lon"]), []).append(name)
+            totals = self.totals[name] = {None: [0.0, 0, float('inf'), float('-inf')]}
+            for year in sorted(entry["years"], key=lambda y: (y is None, y)):
+                temps = [t for t in entry["years"][year] if t is not None]
+                if temps:
+                    totals[year] = [math.fsum(temps), len(temps), min(temps), max(temps)]
+                    overall = totals[None]
+                    overall[0] += totals[year][0]
+                    overall[1] += len(temps)
+                    overall[2] = min(overall[2], totals[year][2])
+                    overall[3] = max(overall[3], totals[year][3])
+        return self
+
+    def cell(self, lat, lon):
+        return math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees)
+
+    def resolve(self, station):
+        # Accept a station name or STN_ID
+        if station in self.stations:
+            return station
+        name = self.by_id.get(str(station))
+        if name is None:
+            raise KeyError(f"unknown station {station!r}")
+        return name
+
+    def series(self, station, month=None):
+        # [(year, value)] in year order: the annual mean of the months present, or one month's value
+        entry = self.stations[self.resolve(station)]
+        result = []
+        for year in sorted(entry["years"], key=lambda y: (y is None, y)):
+            temps = entry["years"][year]
+            if month is not None:
+                value = temps[MONTHS.index(month) if isinstance(month, str) else month]
+            else:
+                present = [t for t in temps if t is not None]
+                value = math.fsum(present) / len(present) if present else None
+            result.append((year, value))
+        return result
+
+    def stations_in_box(self, lat_min, lat_max, lon_min, lon_max):
+        # Names of stations inside the box, visiting only the grid cells that overlap it
+        low_lat, low_lon = self.cell(lat_min, lon_min)
+        high_lat, high_lon = self.cell(lat_max, lon_max)
+        names = []
+        for cell_lat in range(low_lat, high_lat + 1):
+            for cell_lon in range(low_lon, high_lon + 1):
+                for name in self.grid.get((cell_lat, cell_lon), ()):
+                    entry = self.stations[name]
+                    if lat_min <= entry["lat"] <= lat_max and lon_min <= entry["lon"] <= lon_max:
+                        names.append(name)
+        return names
+
+    def bbox(self, lat_min, lat_max, lon_min, lon_max, year=None):
+        # Aggregate of every monthly value inside the box (optionally for one year)
+        names = self.stations_in_box(lat_min, lat_max, lon_min, lon_max)
+        total, count, low, high = 0.0, 0, float('inf'), float('-inf')
+        for name in names:
+            totals = self.totals[name].get(year)
+            if totals is not None and totals[1]:
+                total += totals[0]
+                count += totals[1]
+                low = min(low, totals[2])
+                high = max(high, totals[3])
+        return {"stations": names, "count": count, "mean": total / count if count else None,
+                "min": low if count else None, "max": high if count else None}
+
+    def top_k(self, k=5, warmest=True, year=None):
+        # [(station, average)] for the k warmest (or coolest) stations, overall or for one year
+        ranked = self.ranked.get(year)
+        if ranked is None:  # Sorted once per year, then every query is a slice
+            ranked = self.ranked[year] = sorted(
+                ((totals[year][0] / totals[year][1], name) for name, totals in self.totals.items()
+                 if year in totals and totals[year][1]), key=lambda item: (-item[0], item[1]))
+        picked = ranked[:k] if warmest else ranked[:-k - 1:-1] if k else []
+        return [(name, average) for average, name in picked]
+
+    def save(self, path):
+        # Persist the parsed rows as JSON; lookup tables are rebuilt by load()
+        stations = {name: {**entry, "years": [[year, temps] for year, temps in entry["years"].items()]}
+                    for name, entry in self.stations.items()}
+        atomic_write_bytes(path, json.dumps({"version": 1, "cell_degrees": self.cell_degrees, "stations": stations},
+                                            separators=(",", ":")).encode("utf-8"))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(data["cell_degrees"])
+        for name, entry in data["stations"].items():
+            index.stations[name] = {**entry, "years": {year: temps for year, temps in entry["years"]}}
+        return index.finish()
+
+
 #Save all results to their respective text files.
 def save_results(averages, stations_range, largest_range, warmest_stations, warmest_avg,
                  coolest_stations, coolest_avg, seasonal_file, range_file, extremes_file):
+    # Each file is built in memory and written atomically, so a reader never sees a half-written file
 
     # Save seasonal averages to file
-    with open(seasonal_file, 'w') as f:
-        f.write("Average Season Temperatures for Australia\n")
-        for season, avg in averages.items():
-            if avg is not None:  # If there’s a valid average
-                f.write(f"{season}: {avg:.1f}°C\n")  # Write with 1 decimal place
-            else:
-                f.write(f"{season}: No data available\n")  # Indicate no data
+    lines = ["Average Season Temperatures for Australia\n"]
+    for season, avg in averages.items():
+        if avg is not None:  # If there’s a valid average
+            lines.append(f"{season}: {avg:.1f}°C\n")  # Write with 1 decimal place
+        else:
+            lines.append(f"{season}: No data available\n")  # Indicate no data
+    write_text_file(seasonal_file, lines)
 
     # Save largest temperature range stations to file
-    with open(range_file, 'w') as f:
-        f.write("Station(s) with Largest Temperature Range\n")
-        if largest_range > 0:  # If there’s a valid range
-            f.write(f"Largest Range: {largest_range:.1f}°C\n")
-            for station in stations_range:
-                f.write(f"Station: {station}\n")  # List each station
-        else:
-            f.write("No valid temperature range data available.\n")  # No data case
+    lines = ["Station(s) with Largest Temperature Range\n"]
+    if largest_range > 0:  # If there’s a valid range
+        lines.append(f"Largest Range: {largest_range:.1f}°C\n")
+        for station in stations_range:
+            lines.append(f"Station: {station}\n")  # List each station
+    else:
+        lines.append("No valid temperature range data available.\n")  # No data case
+    write_text_file(range_file, lines)
 
     # Save warmest and coolest stations to file
-    with open(extremes_file, 'w') as f:
-        f.write("Warmest and Coolest Stations by Average Temperature\n")
-        if warmest_stations:  # If there are warmest stations
-            f.write(f"Warmest Average: {warmest_avg:.1f}°C\n")
-            for station in warmest_stations:
-                f.write(f"Warmest Station: {station}\n")  # List each warmest station
-        else:
-            f.write("No valid data for warmest station.\n")  # No data case
-        if coolest_stations:  # If there are coolest stations
-            f.write(f"Coolest Average: {coolest_avg:.1f}°C\n")
-            for station in coolest_stations:
-                f.write(f"Coolest Station: {station}\n")  # List each coolest station
-        else:
-            f.write("No valid data for coolest station.\n")  # No data case
+    lines = ["Warmest and Coolest Stations by Average Temperature\n"]
+    if warmest_stations:  # If there are warmest stations
+        lines.append(f"Warmest Average: {warmest_avg:.1f}°C\n")
+        for station in warmest_stations:
+            lines.append(f"Warmest Station: {station}\n")  # List each warmest station
+    else:
+        lines.append("No valid data for warmest station.\n")  # No data case
+    if coolest_stations:  # If there are coolest stations
+        lines.append(f"Coolest Average: {coolest_avg:.1f}°C\n")
+        for station in coolest_stations:
+            lines.append(f"Coolest Station: {station}\n")  # List each coolest station
+    else:
+        lines.append("No valid data for coolest station.\n")  # No data case
+    write_text_file(extremes_file, lines)
+
+
+def write_text_file(path, lines):
+    # Result files are readable by everyone and use the platform's encoding and line endings, like files
+    # written with open(path, 'w')
+    text = "".join(lines).replace("\n", os.linesep)
+    atomic_write_bytes(path, text.encode(locale.getpreferredencoding(False)), mode=0o644)
+
+
+# Output file names used by each result format, relative to the output directory
+TEXT_FILES = ("average_temp.txt", "largest_temp_range_station.txt", "warmest_and_coolest_station.txt")
+DETAILS_FILE = "station_details"  # Per-station table: .txt for text, .csv for csv
+JSON_FILE = "results.json"
+CSV_FILE = "results.csv"
+NPZ_FILE = "results.npz"
+
+
+def results_dict(results, details=None):
+    # The results tuple (and optional per-station details) as plain JSON-friendly data
+    (averages, stations_range, largest_range, warmest_stations, warmest_avg, coolest_stations, coolest_avg) = results
+    data = {
+        "seasonal_averages": averages,
+        "largest_range": {"range": largest_range if largest_range > 0 else None, "stations": stations_range},
+        "warmest": {"average": warmest_avg if warmest_stations else None, "stations": warmest_stations},
+        "coolest": {"average": coolest_avg if coolest_stations else None, "stations": coolest_stations},
+    }
+    if details is not None:
+        data["stations"] = [{"station": station, **row} for station, row in details.items()]
+    return data
+
+
+def write_text(results, output_dir, details=None):
+    # The original three text files, plus station_details.txt when details are given
+    paths = [os.path.join(output_dir, name) for name in TEXT_FILES]
+    save_results(*results, *paths)
+    if details is not None:
+        path = os.path.join(output_dir, DETAILS_FILE + ".txt")
+        lines = [f"{'Station':<40} {'Count':>7} {'Average':>9} {'Min':>9} {'Max':>9}\n"]
+        lines += [f"{station:<40} {row['count']:>7} {row['average']:>9.2f} {row['min']:>9.1f} {row['max']:>9.1f}\n"
+                  for station, row in details.items()]
+        write_text_file(path, lines)
+        paths.append(path)
+    return paths
+
+
+def write_json(results, output_dir, details=None):
+    path = os.path.join(output_dir, JSON_FILE)
+    atomic_write_bytes(path, json.dumps(results_dict(results, details), indent=2).encode("utf-8"), mode=0o644)
+    return [path]
+
+
+def write_csv(results, output_dir, details=None):
+    # results.csv has one (kind, name, value) row per season and per reported station; station_details.csv
+    # has one row per station
+    data = results_dict(results)
+    rows = [("season", season, avg) for season, avg in data["seasonal_averages"].items()]
+    for kind in ("largest_range", "warmest", "coolest"):
+        value = data[kind]["range" if kind == "largest_range" else "average"]
+        rows += [(kind, station, value) for station in data[kind]["stations"]]
+    paths = [os.path.join(output_dir, CSV_FILE)]
+    write_csv_file(paths[0], ("kind", "name", "value"), rows)
+    if details is not None:
+        paths.append(os.path.join(output_dir, DETAILS_FILE + ".csv"))
+        columns = ["count", "average", "min", "max"] + (["variance"] if any("variance" in row for row in
+                                                                           details.values()) else [])
+        write_csv_file(paths[1], ["station"] + columns,
+                       [[station] + [row.get(column) for column in columns] for station, row in details.items()])
+    return paths
+
+
+def write_csv_file(path, header, rows):
+    buffer = StringIO()
+    writer = csv.writer(buffer, lineterminator=os.linesep)
+    writer.writerow(header)
+    writer.writerows(["" if value is None else value for value in row] for row in rows)
+    atomic_write_bytes(path, buffer.getvalue().encode(locale.getpreferredencoding(False)), mode=0o644)
+
+
+def write_npz(results, output_dir, details=None):
+    # One binary file of named columns (NaN where there is no value), readable with numpy.load
+    if np is None:
+        raise ImportError("format='npz' requires NumPy (pip install numpy)")
+    data = results_dict(results, details)
+    arrays = {
+        "seasons": np.array(list(data["seasonal_averages"]), dtype=str),
+        "seasonal_averages": np.array([np.nan if avg is None else avg for avg in data["seasonal_averages"].values()]),
+    }
+    for kind in ("largest_range", "warmest", "coolest"):
+        value = data[kind]["range" if kind == "largest_range" else "average"]
+        arrays[f"{kind}_value"] = np.array(np.nan if value is None else value)
+        arrays[f"{kind}_stations"] = np.array(data[kind]["stations"], dtype=str)
+    if details is not None:
+        arrays["station"] = np.array(list(details), dtype=str)
+        for column in ("count", "average", "min", "max"):
+            arrays[f"station_{column}"] = np.array([row[column] for row in details.values()])
+    buffer = BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    path = os.path.join(output_dir, NPZ_FILE)
+    atomic_write_bytes(path, buffer.getvalue(), mode=0o644)
+    return [path]
+
+
+# Result formats for write_results; add a function(results, output_dir, details) -> [paths] to support another
+WRITERS = {"text": write_text, "json": write_json, "csv": write_csv, "npz": write_npz}
+
+
+def write_results(results, output_dir=".", format="text", details=None):
+    # Write the process_temperature_data results tuple in the given format(s) and return the paths written.
+    # format is a name in WRITERS or a list of them; details (see process_temperature_data) adds per-station tables
+    formats = [format] if isinstance(format, str) else list(format)
+    unknown = [name for name in formats if name not in WRITERS]
+    if unknown:
+        raise ValueError(f"unknown output format(s) {', '.join(unknown)}; choose from {', '.join(WRITERS)}")
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for name in formats:
+        paths += WRITERS[name](results, output_dir, details)
+    return paths
+
+
+class TemperatureWatcher:
+    """Watch mode: keep the results current while station files land in a directory.
+
+    Every ``interval`` seconds the directory is scanned with ``os.scandir`` (polling is cheap here and
+    also works on network shares, where inotify does not). A file is only read once its size and mtime
+    are unchanged between two scans, so half-copied files are skipped until they settle; while a file
+    behind the current results is being rewritten, updates wait for it. New files are
+    folded into the in-memory aggregates with update_state, and a changed or removed file triggers a
+    rebuild. The outputs are then rewritten atomically with write_results. ``serve`` publishes the
+    latest results as JSON over HTTP.
+    """
+
+    def __init__(self, directory, output_dir=".", formats=("text",), pattern="stations_group_*.csv", interval=2.0,
+                 engine="python", processes=None, state_file=None, details=False, tie_tolerance=0.0):
+        if engine not in ("python", "numpy"):
+            raise ValueError("watch mode supports engine='python' or 'numpy'")
+        self.directory = directory
+        self.output_dir = output_dir
+        self.formats = formats
+        self.pattern = pattern
+        self.interval = interval
+        self.engine = engine
+        self.processes = processes
+        self.state_file = state_file
+        self.details = details
+        self.tie_tolerance = tie_tolerance
+        self.state = load_state(state_file) if state_file else empty_state()
+        self.seen = {}  # path -> (size, mtime_ns) at the previous scan
+        self.folded = None  # path -> (size, mtime_ns) of the files behind the current results
+        self.snapshot = json.dumps({"status": "starting"}).encode("utf-8")  # Served by the HTTP endpoint
+        self.stopped = threading.Event()
+        self.server = None
+
+    def scan(self):
+        # {path: (size, mtime_ns)} of the matching files
+        found = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if fnmatch.fnmatch(entry.name, self.pattern) and entry.is_file():
+                    stat = entry.stat()
+                    found[entry.path] = (stat.st_size, stat.st_mtime_ns)
+        return found
+
+    def poll(self):
+        # Scan once; if the settled files differ from the ones behind the current results, fold them in and
+        # rewrite the outputs. Returns True when the results were updated.
+        found = self.scan()
+        settled = {path: signature for path, signature in found.items() if self.seen.get(path) == signature}
+        self.seen = found
+        if settled == self.folded:
+            return False
+        if any(path in found and path not in settled for path in self.folded or ()):
+            # A file behind the current results is being rewritten; leaving it out would treat it as removed,
+            # and folding it now could read it half-written, so wait until it has settled
+            return False
+
+        file_urls = sorted(settled)
+        aggregates = update_state(self.state, file_urls, self.engine, self.processes)
+        details = {} if self.details else None
+        results = summarise_aggregates(*aggregates, self.tie_tolerance, details)
+        write_results(results, self.output_dir, self.formats, details)
+        if self.state_file:
+            save_state(self.state_file, self.state)
+        self.folded = settled
+        self.snapshot = json.dumps({"status": "ok", "updated": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                                    "files": file_urls, **results_dict(results, details)}).encode("utf-8")
+        print(f"Results updated from {len(file_urls)} file(s)")
+        return True
+
+    def serve(self, host="127.0.0.1", port=8000):
+        # Serve the latest results at http://host:port/ (GET / or /results) from a background thread
+        self.server = http.server.ThreadingHTTPServer((host, port), WatchHandler)
+        self.server.watcher = self
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.server
+
+    def run(self):
+        # Poll until stop() is called or Ctrl+C; the files already present are taken as settled
+        self.seen = self.scan()
+        try:
+            while True:
+                try:
+                    self.poll()
+                except Exception as e:
+                    print(f"An error occurred: {e}")  # Keep watching; the next change retries
+                if self.stopped.wait(self.interval):
+                    break
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if self.server is not None:
+                self.server.shutdown()
+                self.server.server_close()
+
+    def stop(self):
+        self.stopped.set()
+
+
+class WatchHandler(http.server.BaseHTTPRequestHandler):
+    # GET / or /results: the watcher's latest results as JSON
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/results"):
+            self.send_error(404)
+            return
+        body = self.server.watcher.snapshot
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep the watch log to result updates
+
+
+# Where the yearly station files live when no --source is given (a local temperature_data/ copy is preferred)
+DEFAULT_SOURCE = "https://raw.githubusercontent.com/Ruthenmoir/HIT_137_Assignment_2/refs/heads/main/temperature_data/"
+DEFAULT_YEARS = (1986, 2005)
+
+
+def year_range(text):
+    # argparse type for "1990" or "1986-2005"
+    first, _, last = text.partition("-")
+    try:
+        first, last = int(first), int(last or first)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YEAR or FIRST-LAST, got '{text}'")
+    if first > last:
+        raise argparse.ArgumentTypeError(f"year range '{text}' is backwards")
+    return first, last
+
+
+def station_files(roots, years):
+    # stations_group_<year>.csv under each root (local directory or base URL) for every year in the ranges
+    names = [f"stations_group_{year}.csv" for first, last in years for year in range(first, last + 1)]
+    return [root.rstrip("/") + "/" + name if is_url(root) else os.path.join(root, name)
+            for root in roots for name in names]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Seasonal averages, largest temperature ranges and warmest/coolest stations "
+                    "from stations_group_<year>.csv files.")
+    data = parser.add_argument_group("data")
+    data.add_argument("--years", type=year_range, action="append", metavar="FIRST-LAST",
+                      help="year or range of years to read (repeatable; default 1986-2005)")
+    data.add_argument("--source", action="append", metavar="ROOT",
+                      help="directory or base URL holding the yearly files (repeatable; default: temperature_data/ "
+                           "next to this script if present, else the team GitHub copy)")
+    data.add_argument("--files", nargs="+", metavar="FILE",
+                      help="explicit files, directories, globs or URLs to read instead of --years/--source")
+
+    run = parser.add_argument_group("processing")
+    run.add_argument("--engine", choices=["python", "numpy", "exact"], default="python")
+    run.add_argument("--workers", type=int, default=8, help="concurrent downloads (default 8)")
+    run.add_argument("--processes", type=int, help="worker processes for parsing (default: parse in this process)")
+    run.add_argument("--timeout", type=float, default=30, help="seconds allowed per file download (default 30)")
+    run.add_argument("--retries", type=int, default=3, help="retries after the first attempt (default 3)")
+    run.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="download cache directory")
+    run.add_argument("--no-cache", action="store_true", help="do not cache downloads")
+    run.add_argument("--revalidate", action="store_true", help="check cached downloads with the server")
+    run.add_argument("--state-file", help="keep incremental aggregates here and only read new or changed files")
+    run.add_argument("--column-store", help="keep the parsed archive as .npy columns in this directory")
+    run.add_argument("--tie-tolerance", type=float, default=0.0, help="degrees within which stations tie")
+
+    output = parser.add_argument_group("output")
+    output.add_argument("--output-dir", default=".", help="directory for the result files (default: current)")
+    output.add_argument("--format", nargs="+", choices=list(WRITERS), default=["text"], help="result format(s)")
+    output.add_argument("--details", action="store_true", help="also write a per-station table")
+    output.add_argument("--profile", action="store_true",
+                        help="print per-stage timings and the slowest functions to stderr when done")
+    output.add_argument("--metrics-file", help="write per-file and per-stage metrics to this file")
+    output.add_argument("--metrics-format", choices=["jsonl", "prometheus"], default="jsonl")
+
+    watch = parser.add_argument_group("watch mode")
+    watch.add_argument("--watch", metavar="DIR", help="keep running and update the results as files land in DIR")
+    watch.add_argument("--pattern", default="stations_group_*.csv", help="file names to watch for")
+    watch.add_argument("--interval", type=float, default=2.0, help="seconds between directory scans (default 2)")
+    watch.add_argument("--serve", type=int, metavar="PORT", help="serve the latest results as JSON on this port")
+    watch.add_argument("--host", default="127.0.0.1", help="address for --serve (default 127.0.0.1)")
+    return parser
+
+
+def print_profile(metrics, profiler, stream):
+    # --profile report: stage timings and totals from RunMetrics, then the top functions by cumulative time
+    totals = metrics.totals()
+    print("Stage timings:", file=stream)
+    for stage, seconds in metrics.stages.items():
+        print(f"  {stage:<14} {seconds:9.3f}s", file=stream)
+    print(f"Files {totals['files']}, {totals['bytes']} bytes, {totals['rows']} rows, {totals['cells']} cells", file=stream)
+    for key in ("skipped_rows", "skipped_cells"):
+        if totals[key]:
+            print(f"  {key.replace('_', ' ')}: {totals[key]}", file=stream)
+    pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(15)
+
 
 #Main function to orchestrate the program execution.
-def main():
-
-    # Output file names
-    seasonal_file = "average_temp.txt"
-    range_file = "largest_temp_range_station.txt"
-    extremes_file = "warmest_and_coolest_station.txt"
-
-    # List of URLs for CSV files containing temperature data from team github
-    file_urls = [
-        "https://raw.githubusercontent.com/Ruthenmoir/HIT_137_Assignment_2/refs/heads/main/temperature_data/stations_group_1986.csv",
-        "https://raw.githubusercontent.com/Ruthenmoir/HIT_137_Assignment_2/refs/heads/main/temperature_data/stations_group_1987.csv",
-        "https://raw.githubusercontent.com/Ruthenmoir/HIT_137_Assignment_2/refs/heads/main/temperature_data/stations_group_1988.csv",
-        "https://raw.githubusercontent.com/Ruthenmoir/HIT_137_Assignment_2/refs/heads/main/temperature_data/stations_group_1989.csv",
-        "https://raw.githubusercontent.com/Ruthenmoir/HIT_137_Assignment_2/refs/heads/main/temperature_data/stations_group_1990.csv",
-        "https://raw.githubusercontent.com/Ruthenmoir/HIT_137_Assignment_2/refs/heads/main/temperature_data/stations_group_1991.csv",
-        "https://raw.githubusercontent.com/Ruthenmoir/HIT_137_Assignment_2/refs/heads/main/temperature_data/stations_group_1992.csv",
-        "https://raw.githubusercontent.com/Ruthenmoir/HIT_137_Assignment_2/refs/heads/main/temperature_data/stations_group_1993.csv",
-        "https://raw.githubusercontent.com/Ruthenmoir/HIT_137_Assignment_2/refs/heads/main/temperature_data/stations_group_1994.csv",
-        "https://raw.githubusercontent.com/Ruthenmoir/HIT_137_Assignment_2/refs/heads/main/temperature_data/stations_group_1995.csv",
-        "https://raw.githubusercontent.com/Ruthenmoir/HIT_137_Assignment_2/refs/heads/main/temperature_data/stations_group_1996.csv",
-        "https://raw.githubusercontent.com/Ruthenmoir/HIT_137_Assignment_2/refs/heads/main/temperature_data/stations_group_1997.csv",
-        "https://raw.githubusercontent.com/Ruthenmoir/HIT_137_Assignment_2/refs/heads/main/temperature_data/stations_group_1998.csv",
-        "https://raw.githubusercontent.com/Ruthenmoir/HIT_137_Assignment_2/refs/heads/main/temperature_data/stations_group_1999.csv",
-        "https://raw.githubusercontent.com/Ruthenmoir/HIT_137_Assignment_2/refs/heads/main/temperature_data/stations_group_2000.csv",
-        "https://raw.githubusercontent.com/Ruthenmoir/HIT_137_Assignment_2/refs/heads/main/temperature_data/stations_group_2001.csv",
-        "https://raw.githubusercontent.com/Ruthenmoir/HIT_137_Assignment_2/refs/heads/main/temperature_data/stations_group_2002.csv",
-        "https://raw.githubusercontent.com/Ruthenmoir/HIT_137_Assignment_2/refs/heads/main/temperature_data/stations_group_2003.csv",
-        "https://raw.githubusercontent.com/Ruthenmoir/HIT_137_Assignment_2/refs/heads/main/temperature_data/stations_group_2004.csv",
-        "https://raw.githubusercontent.com/Ruthenmoir/HIT_137_Assignment_2/refs/heads/main/temperature_data/stations_group_2005.csv",
-    ]
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.watch:
+        watcher = TemperatureWatcher(args.watch, args.output_dir, args.format, args.pattern, args.interval,
+                                     args.engine, args.processes, args.state_file, args.details, args.tie_tolerance)
+        if args.serve is not None:
+            watcher.serve(args.host, args.serve)
+            print(f"Serving results on http://{args.host}:{args.serve}/")
+        print(f"Watching {args.watch} for {args.pattern} (Ctrl+C to stop)")
+        watcher.run()
+        return 0
+
+    if args.files:
+        file_urls = args.files
+    else:
+        roots = args.source
+        if not roots:
+            # Prefer the copy of the data that ships next to this script; fall back to the (cached) downloads
+            local_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "temperature_data")
+            roots = [local_dir if os.path.isdir(local_dir) else DEFAULT_SOURCE]
+        file_urls = station_files(roots, args.years or [DEFAULT_YEARS])
+
+    metrics = RunMetrics() if args.profile or args.metrics_file else None
+    profiler = cProfile.Profile() if args.profile else None
+    details = {} if args.details else None
 
     try:
-        # Process data and unpack results into variables
-        (seasonal_averages, stations_range, largest_range,
-         warmest_stations, warmest_avg, coolest_stations, coolest_avg) = process_temperature_data(file_urls)
+        if profiler is not None:
+            profiler.enable()
+        # Process data
+        results = process_temperature_data(
+            file_urls, max_workers=args.workers, timeout=args.timeout, retries=args.retries,
+            cache_dir=None if args.no_cache else args.cache_dir, revalidate=args.revalidate, engine=args.engine,
+            processes=args.processes, state_file=args.state_file, column_store=args.column_store, metrics=metrics,
+            tie_tolerance=args.tie_tolerance, details=details)
 
         # Save all results to files
-        save_results(seasonal_averages, stations_range, largest_range,
-                     warmest_stations, warmest_avg, coolest_stations, coolest_avg,
-                     seasonal_file, range_file, extremes_file)
+        with metrics.stage("write") if metrics is not None else contextlib.nullcontext():
+            paths = write_results(results, args.output_dir, args.format, details)
+        if profiler is not None:
+            profiler.disable()
 
         # Confirm successful completion
-        print(f"Results saved to {seasonal_file}, {range_file}, and {extremes_file}")
+        print(f"Results saved to {', '.join(paths)}")
 
     except Exception as e:
         print(f"An error occurred: {e}")  # Handle any top-level errors
+        return 1
+
+    if args.metrics_file:
+        metrics.write(args.metrics_file, args.metrics_format)
+    if profiler is not None:
+        print_profile(metrics, profiler, sys.stderr)
+    return 0
 
 
 if __name__ == "__main__":
-    main()  # Run the program if this file is executed directly
+    sys.exit(main())  # Run the program if this file is executed directly
 
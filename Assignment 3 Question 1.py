@@ -8,6 +8,79 @@ from tkinter import filedialog, simpledialog
 from PIL import Image, ImageTk
 
 
+class preview_pyramid:
+    """Caches downscaled previews of one image so they are not resized from full resolution every time.
+
+    Levels are built lazily: level 0 is the image itself and each further level halves the one before.
+    A preview is resized with LANCZOS from the smallest level that is still at least as large, so it
+    never touches more than about four times its own number of pixels. Images are never changed in
+    place, so a pyramid stays valid for as long as its image is in use.
+
+    Attributes:
+        image (PIL.Image): The full-resolution image.
+        levels (list): Levels built so far, largest first.
+        previews (dict): Finished previews keyed by (width, height).
+    """
+    def __init__(self, image):
+        self.image = image
+        self.levels = [image]
+        self.previews = {}
+
+    def level_for(self, width, height):
+        """Returns the smallest level at least width x height in size, building levels as needed.
+
+        Args:
+            width (int): Width of the preview in pixels.
+            height (int): Height of the preview in pixels.
+
+        Returns:
+            PIL.Image: The level to resize the preview from.
+        """
+        level = self.levels[-1]
+        while level.width // 2 >= max(width, 1) and level.height // 2 >= max(height, 1):
+            try:
+                level = level.reduce(2)  # Averages 2x2 blocks, several times faster than a resize
+            except ValueError:  # Modes such as "P" and "1" cannot be averaged
+                level = level.resize((level.width // 2, level.height // 2), Image.NEAREST)
+            self.levels.append(level)
+        for level in reversed(self.levels):
+            if level.width >= width and level.height >= height:
+                return level
+        return self.image  # Enlarging: start from full resolution
+
+    def preview(self, width, height):
+        """Returns the image resized to width x height, from the cache when possible.
+
+        Args:
+            width (int): Width of the preview in pixels.
+            height (int): Height of the preview in pixels.
+
+        Returns:
+            PIL.Image: The preview (the image itself if it is already that size).
+        """
+        size = (width, height)
+        if size == self.image.size:
+            return self.image
+        if size not in self.previews:
+            self.previews[size] = self.level_for(width, height).resize(size, Image.LANCZOS)
+        return self.previews[size]
+
+    def fit_width(self, max_width):
+        """Returns a preview at most max_width wide, keeping the aspect ratio."""
+        orig_width, orig_height = self.image.size
+        new_width = min(max_width, orig_width)
+        new_height = int((new_width / orig_width) * orig_height)
+        return self.preview(new_width, new_height)
+
+    def fit_box(self, max_size):
+        """Returns a preview whose width and height are at most max_size, keeping the aspect ratio."""
+        image_width, image_height = self.image.size
+        if image_width > max_size or image_height > max_size:
+            scale = min(max_size / image_width, max_size / image_height)
+            return self.preview(int(image_width * scale), int(image_height * scale))
+        return self.image
+
+
 class image_manager:
     """Manages image processing operations such as opening, resizing, cropping, and saving images.
 
@@ -21,7 +94,8 @@ class image_manager:
         crop_rect (int): Canvas rectangle ID for the crop selection.
         history (list): List of image states for undo/redo (max 10).
         history_index (int): Current position in the history list.
-        initial_image (PIL.Image): Copy of the original image for reset.
+        initial_image (PIL.Image): The image as opened, for reset.
+        pyramids (dict): Preview pyramids of the image states in use, keyed by id of the image.
     """
     def __init__(self, image_canvas, status_label, gui):
         self.original_image = None
@@ -35,6 +109,31 @@ class image_manager:
         self.history_index = -1
         self.initial_image = None
         self.displayed_image_size = None
+        self.pyramids = {}
+
+    def get_pyramid(self, image):
+        """Returns the cached preview pyramid of an image, creating it on first use.
+
+        Args:
+            image (PIL.Image): One of the image states (current, initial or in the history).
+
+        Returns:
+            preview_pyramid: The pyramid for that image.
+        """
+        pyramid = self.pyramids.get(id(image))
+        if pyramid is None or pyramid.image is not image:
+            pyramid = preview_pyramid(image)
+            self.pyramids[id(image)] = pyramid
+        # Drop pyramids of states that are gone; each pyramid keeps its image (and so its id) alive until then
+        in_use = {id(state) for state in self.history + [self.original_image, self.initial_image]}
+        in_use.add(id(image))
+        for key in [key for key in self.pyramids if key not in in_use]:
+            del self.pyramids[key]
+        return pyramid
+
+    def show_current(self):
+        """Displays the current image on the canvas, scaled to at most 1000 pixels wide."""
+        self.display_image(self.get_pyramid(self.original_image).fit_width(1000))
 
     def open_image(self):
         """Opens an image file and displays it on the canvas.
@@ -46,15 +145,8 @@ class image_manager:
         if filepath:
             self.status_label.config(text=f"Opening image: {filepath}")
             self.original_image = Image.open(filepath)
-            self.initial_image = self.original_image.copy()  # Store initial state for reset
-            
-            # Calculate new dimensions with width = 1000, maintaining aspect ratio
+            self.initial_image = self.original_image  # Store initial state for reset (images are never edited in place)
             orig_width, orig_height = self.original_image.size
-            new_width = min(1000, orig_width)
-            new_height = int((new_width / orig_width) * orig_height)
-            
-            # Resize image for display
-            display_image = self.original_image.resize((new_width, new_height), Image.LANCZOS)
             
             # Update sliders with original image dimensions
             self.gui.width_slider.set(orig_width)
@@ -62,8 +154,8 @@ class image_manager:
             self.gui.width_slider.config(state="normal")
             self.gui.height_slider.config(state="normal")
             
-            # Display the resized image
-            self.display_image(display_image)
+            # Display the image scaled to width 1000, maintaining aspect ratio
+            self.show_current()
         else:
             self.gui.width_slider.config(state="disabled")
             self.gui.height_slider.config(state="disabled")
@@ -112,10 +204,7 @@ class image_manager:
             if self.original_image:
                 self.save_to_history()
                 self.original_image = self.original_image.resize((new_width, new_height), Image.LANCZOS)
-                display_width = min(1000, new_width)
-                display_height = int((display_width / new_width) * new_height)
-                display_image = self.original_image.resize((display_width, display_height), Image.LANCZOS)
-                self.display_image(display_image)
+                self.show_current()
                 self.status_label.config(text=f"Image resized to: {new_width} x {new_height}")
             else:
                 self.status_label.config(text="No image loaded")
@@ -163,10 +252,11 @@ class image_manager:
         """Saves the current image state to the history for undo/redo.
 
         Maintains a maximum of 10 history states, removing the oldest if exceeded.
+        Images are never modified in place, so states are stored without copying and keep their previews.
         """
         if self.original_image:
             self.history = self.history[:self.history_index + 1] 
-            self.history.append(self.original_image.copy())  
+            self.history.append(self.original_image)  
             self.history_index += 1            
             if len(self.history) > 10:    # Limit history to 10 states to manage memory
                 self.history.pop(0)
@@ -176,8 +266,8 @@ class image_manager:
         """Reverts to the previous image state in the history."""
         if self.history_index > 0:
             self.history_index -= 1
-            self.original_image = self.history[self.history_index].copy()
-            self.display_image(self.original_image)
+            self.original_image = self.history[self.history_index]
+            self.show_current()
             self.status_label.config(text="Undo performed")
         else:
             self.status_label.config(text="Nothing to undo")
@@ -186,8 +276,8 @@ class image_manager:
         """Restores the next image state in the history."""
         if self.history_index < len(self.history) - 1:
             self.history_index += 1
-            self.original_image = self.history[self.history_index].copy()
-            self.display_image(self.original_image)
+            self.original_image = self.history[self.history_index]
+            self.show_current()
             self.status_label.config(text="Redo performed")
         else:
             self.status_label.config(text="Nothing to redo")
@@ -258,7 +348,7 @@ class image_manager:
                 cropped_image = self.original_image.crop(crop_box)
                 # Update the main canvas with the cropped image
                 self.original_image = cropped_image
-                self.display_image(self.original_image)
+                self.show_current()
                 self.status_label.config(text=f"Image cropped to {crop_box}")
                 try:
                     # Use initial_image for the original or history[-2] for the pre-crop image
@@ -334,14 +424,10 @@ class image_manager:
     def reset_image(self): 
         """Resets the image to its initial state."""
         if self.initial_image:
-            self.original_image = self.initial_image.copy()
-            self.history = [self.original_image.copy()]
+            self.original_image = self.initial_image
+            self.history = [self.original_image]
             self.history_index = 0
-            orig_width, orig_height = self.original_image.size
-            new_width = min(1000, orig_width)
-            new_height = int((new_width / orig_width) * orig_height)
-            display_image = self.original_image.resize((new_width, new_height), Image.LANCZOS)
-            self.display_image(display_image)
+            self.show_current()
             self.status_label.config(text="Image reset to original")
         else:
             self.status_label.config(text="No image loaded")
@@ -356,15 +442,8 @@ class image_manager:
         Returns:
             ImageTk.PhotoImage: Tkinter-compatible scaled image.
         """
-     
-        image_width, image_height = image.size  
-        if image_width > max_size or image_height > max_size:
-            # Calculate scaling factor to fit within max_size
-            scale = min(max_size / image_width, max_size / image_height)
-            new_width = int(image_width * scale)
-            new_height = int(image_height * scale)
-            image = image.resize((new_width, new_height), Image.LANCZOS)
-        return ImageTk.PhotoImage(image)
+        # The preview comes from the image's cached pyramid rather than a full-resolution resize
+        return ImageTk.PhotoImage(self.get_pyramid(image).fit_box(max_size))
     
     def convert_to_grayscale(self):
         """Converts the current image to grayscale."""
@@ -374,11 +453,7 @@ class image_manager:
                 # Convert to grayscale using PIL
                 self.original_image = self.original_image.convert('L')
                 # Update display (resize to fit canvas if needed)
-                orig_width, orig_height = self.original_image.size
-                new_width = min(1000, orig_width)
-                new_height = int((new_width / orig_width) * orig_height)
-                display_image = self.original_image.resize((new_width, new_height), Image.LANCZOS)
-                self.display_image(display_image)
+                self.show_current()
                 self.status_label.config(text="Image converted to grayscale")
             except Exception as e:
                 self.status_label.config(text=f"Error converting to grayscale: {e}")